@@ -1,4 +1,12 @@
 from django.contrib import admin
+from .models import DownloadJob
 
 # Register your models here.
- 
+
+
+@admin.register(DownloadJob)
+class DownloadJobAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'platform', 'video_id', 'format', 'state', 'bytes_total', 'created_at', 'finished_at')
+    list_filter = ('state', 'platform', 'download_type')
+    search_fields = ('video_id', 'url', 'title')
+    readonly_fields = ('job_id', 'created_at', 'started_at', 'finished_at')
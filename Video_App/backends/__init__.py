@@ -0,0 +1,29 @@
+import threading
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .base import JobBackend
+
+_backend = None
+_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide job backend configured by JOB_BACKEND"""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                backend_path = getattr(settings, 'JOB_BACKEND', 'Video_App.backends.sqlite.SQLiteBackend')
+                options = getattr(settings, 'JOB_BACKEND_OPTIONS', {})
+                _backend = import_string(backend_path)(**options)
+    return _backend
+
+
+def reset_backend():
+    """Forget the cached backend (used when settings change)"""
+    global _backend
+    _backend = None
+
+
+__all__ = ['JobBackend', 'get_backend', 'reset_backend']
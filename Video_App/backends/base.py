@@ -0,0 +1,64 @@
+import uuid
+
+
+class JobBackend:
+    """Shared queue and state store for download jobs.
+
+    A backend is the only place nodes coordinate through: any node can
+    enqueue a job or read its status, any worker node can claim and run it,
+    and extracted metadata is cached here so every node sees the same copy.
+    Job states use the DownloadJob.STATE_* values.
+    """
+
+    def new_job_id(self):
+        return str(uuid.uuid4())
+
+    def enqueue(self, payload, dedup_key=None):
+        """Queue a job and return its id.
+
+        If dedup_key is given and a queued or running job already has the
+        same key, that job's id is returned instead of queueing a duplicate.
+        """
+        raise NotImplementedError
+
+    def claim(self, worker_id, timeout=0):
+        """Take the oldest queued job, returning (job_id, payload) or None"""
+        raise NotImplementedError
+
+    def heartbeat(self, job_id, progress=None, worker_id=None):
+        """Mark a running job as alive, optionally recording its progress.
+
+        heartbeat, complete, fail and requeue take the worker_id the job was
+        claimed with. With it, the update only applies while that worker
+        still owns the job, and they return False otherwise: a worker whose
+        job was requeued as stale and claimed elsewhere cannot overwrite the
+        new owner's state.
+        """
+        raise NotImplementedError
+
+    def complete(self, job_id, result, worker_id=None):
+        raise NotImplementedError
+
+    def fail(self, job_id, error, state='failed', worker_id=None):
+        raise NotImplementedError
+
+    def get_status(self, job_id):
+        """Return a dict describing the job, or None if it is unknown"""
+        raise NotImplementedError
+
+    def queue_depth(self):
+        raise NotImplementedError
+
+    def requeue(self, job_id, worker_id=None):
+        """Put a running job back at the front of the queue, e.g. when its worker drains"""
+        raise NotImplementedError
+
+    def requeue_stale(self, timeout):
+        """Put running jobs without a heartbeat for `timeout` seconds back in the queue"""
+        raise NotImplementedError
+
+    def cache_get(self, key):
+        raise NotImplementedError
+
+    def cache_set(self, key, value, ttl):
+        raise NotImplementedError
@@ -0,0 +1,224 @@
+import json
+import time
+from django.core.exceptions import ImproperlyConfigured
+from .base import JobBackend
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+
+# Queue a job unless its dedup key names one that is still queued or running.
+# KEYS: dedup key, job hash, queue. ARGV: job id, dedup TTL, job-hash prefix,
+# then the job hash fields as name/value pairs.
+ENQUEUE_SCRIPT = """
+if KEYS[1] ~= '' then
+    local existing = redis.call('GET', KEYS[1])
+    if existing then
+        local state = redis.call('HGET', ARGV[3] .. existing, 'state')
+        if state == 'queued' or state == 'running' then
+            return existing
+        end
+    end
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+end
+redis.call('HSET', KEYS[2], unpack(ARGV, 4))
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('LPUSH', KEYS[3], ARGV[1])
+return ARGV[1]
+"""
+
+# Start tracking claimed jobs whose worker died before recording the claim.
+# KEYS: processing list, running set. ARGV: now.
+ADOPT_SCRIPT = """
+local adopted = 0
+for _, job_id in ipairs(redis.call('LRANGE', KEYS[1], 0, -1)) do
+    if redis.call('ZADD', KEYS[2], 'NX', ARGV[1], job_id) == 1 then
+        adopted = adopted + 1
+    end
+end
+return adopted
+"""
+
+# Shared by the scripts below: true while worker_id ('' = anyone) runs the job
+OWNED_LUA = """
+local function owned(job_key, worker_id)
+    if worker_id == '' then
+        return true
+    end
+    local current = redis.call('HMGET', job_key, 'state', 'worker')
+    return current[1] == 'running' and current[2] == worker_id
+end
+"""
+
+# Record a heartbeat for a job its worker still owns.
+# KEYS: job hash, running set. ARGV: job id, now, worker id, then the job
+# hash fields as name/value pairs.
+HEARTBEAT_SCRIPT = OWNED_LUA + """
+if not owned(KEYS[1], ARGV[3]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+redis.call('ZADD', KEYS[2], 'XX', ARGV[2], ARGV[1])
+return 1
+"""
+
+# Finish a job its worker still owns, releasing its dedup key if that key
+# still names it.
+# KEYS: job hash, running set, processing list. ARGV: job id, worker id,
+# dedup-key prefix, then the job hash fields as name/value pairs.
+FINISH_SCRIPT = OWNED_LUA + """
+if not owned(KEYS[1], ARGV[2]) then
+    return 0
+end
+local dedup_key = redis.call('HGET', KEYS[1], 'dedup_key')
+redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('LREM', KEYS[3], 0, ARGV[1])
+if dedup_key and dedup_key ~= '' and redis.call('GET', ARGV[3] .. dedup_key) == ARGV[1] then
+    redis.call('DEL', ARGV[3] .. dedup_key)
+end
+return 1
+"""
+
+# Put a running job back on the queue, unless another caller already did
+# or (with a worker id) another worker owns it now.
+# KEYS: running set, processing list, queue, job hash. ARGV: job id, now, worker id.
+REQUEUE_SCRIPT = OWNED_LUA + """
+if not owned(KEYS[4], ARGV[3]) or redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[4], 'state', 'queued', 'worker', '', 'updated_at', ARGV[2])
+redis.call('LREM', KEYS[2], 0, ARGV[1])
+-- claim() takes from the right, so this job runs next
+redis.call('RPUSH', KEYS[3], ARGV[1])
+return 1
+"""
+
+
+class RedisBackend(JobBackend):
+    """Job backend on a Redis server (6.2 or later) shared by all nodes.
+
+    Layout (all keys share `prefix`):
+      queue            list of queued job ids (LPUSH / BLMOVE)
+      processing       list of claimed job ids, moved there atomically from queue
+      running          sorted set of running job ids scored by last heartbeat
+      job:<id>         hash with state, payload, progress, result, error
+      dedup:<key>      id of the active job for a dedup key
+      cache:<key>      JSON value with a TTL
+
+    A claim moves the job from queue to processing in one command, so a
+    worker dying right after it cannot lose the job: requeue_stale starts
+    the heartbeat clock on any processing entry missing from running.
+    Updates from a worker check in the same script that it still owns the
+    job.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='speedy:', job_ttl=7 * 24 * 3600):
+        if redis is None:
+            raise ImproperlyConfigured('RedisBackend requires the "redis" package (pip install redis)')
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.job_ttl = job_ttl
+        self._enqueue_script = self.client.register_script(ENQUEUE_SCRIPT)
+        self._adopt_script = self.client.register_script(ADOPT_SCRIPT)
+        self._requeue_script = self.client.register_script(REQUEUE_SCRIPT)
+        self._heartbeat_script = self.client.register_script(HEARTBEAT_SCRIPT)
+        self._finish_script = self.client.register_script(FINISH_SCRIPT)
+
+    def _key(self, *parts):
+        return self.prefix + ':'.join(parts)
+
+    def enqueue(self, payload, dedup_key=None):
+        job_id = self.new_job_id()
+        now = time.time()
+        fields = {
+            'state': 'queued',
+            'payload': json.dumps(payload),
+            'dedup_key': dedup_key or '',
+            'enqueued_at': now,
+            'updated_at': now,
+        }
+        # One script, so concurrent requests for the same key queue one job
+        return self._enqueue_script(
+            keys=[self._key('dedup', dedup_key) if dedup_key else '', self._key('job', job_id), self._key('queue')],
+            args=[job_id, self.job_ttl, self._key('job', '')] + [item for pair in fields.items() for item in pair],
+        )
+
+    def claim(self, worker_id, timeout=0):
+        if timeout:
+            job_id = self.client.blmove(
+                self._key('queue'), self._key('processing'), max(1, int(timeout)), 'RIGHT', 'LEFT')
+        else:
+            job_id = self.client.lmove(self._key('queue'), self._key('processing'), 'RIGHT', 'LEFT')
+        if not job_id:
+            return None
+
+        job_key = self._key('job', job_id)
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.hset(job_key, mapping={'state': 'running', 'worker': worker_id, 'updated_at': now})
+        pipe.zadd(self._key('running'), {job_id: now})
+        pipe.hget(job_key, 'payload')
+        payload = pipe.execute()[-1]
+        return job_id, json.loads(payload or '{}')
+
+    def heartbeat(self, job_id, progress=None, worker_id=None):
+        fields = {'updated_at': time.time()}
+        if progress is not None:
+            fields['progress'] = json.dumps(progress)
+        return bool(self._heartbeat_script(
+            keys=[self._key('job', job_id), self._key('running')],
+            args=[job_id, fields['updated_at'], worker_id or ''] + [item for pair in fields.items() for item in pair],
+        ))
+
+    def _finish(self, job_id, fields, worker_id):
+        fields['updated_at'] = time.time()
+        return bool(self._finish_script(
+            keys=[self._key('job', job_id), self._key('running'), self._key('processing')],
+            args=[job_id, worker_id or '', self._key('dedup', '')] + [item for pair in fields.items() for item in pair],
+        ))
+
+    def complete(self, job_id, result, worker_id=None):
+        return self._finish(job_id, {'state': 'succeeded', 'result': json.dumps(result)}, worker_id)
+
+    def fail(self, job_id, error, state='failed', worker_id=None):
+        return self._finish(job_id, {'state': state, 'error': error or ''}, worker_id)
+
+    def get_status(self, job_id):
+        data = self.client.hgetall(self._key('job', str(job_id)))
+        if not data:
+            return None
+        return {
+            'job_id': str(job_id),
+            'state': data.get('state'),
+            'payload': json.loads(data.get('payload') or '{}'),
+            'worker': data.get('worker'),
+            'progress': json.loads(data['progress']) if data.get('progress') else None,
+            'result': json.loads(data['result']) if data.get('result') else None,
+            'error': data.get('error') or None,
+            'enqueued_at': float(data.get('enqueued_at') or 0),
+            'updated_at': float(data.get('updated_at') or 0),
+        }
+
+    def queue_depth(self):
+        return self.client.llen(self._key('queue'))
+
+    def requeue(self, job_id, worker_id=None):
+        keys = [self._key('running'), self._key('processing'), self._key('queue'), self._key('job', job_id)]
+        return bool(self._requeue_script(keys=keys, args=[job_id, time.time(), worker_id or '']))
+
+    def requeue_stale(self, timeout):
+        self._adopt_script(keys=[self._key('processing'), self._key('running')], args=[time.time()])
+        cutoff = time.time() - timeout
+        stale = self.client.zrangebyscore(self._key('running'), '-inf', cutoff)
+        # Only the caller whose script removes the entry requeues it
+        return sum(self.requeue(job_id) for job_id in stale)
+
+    def cache_get(self, key):
+        value = self.client.get(self._key('cache', key))
+        return json.loads(value) if value else None
+
+    def cache_set(self, key, value, ttl):
+        self.client.set(self._key('cache', key), json.dumps(value), ex=int(ttl))
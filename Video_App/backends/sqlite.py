@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from .base import JobBackend
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedup_key TEXT,
+    worker TEXT,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state_idx ON jobs (state, enqueued_at);
+CREATE INDEX IF NOT EXISTS jobs_dedup_idx ON jobs (dedup_key, state);
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+'''
+
+
+class SQLiteBackend(JobBackend):
+    """Job backend stored in a single SQLite file.
+
+    Point `path` at a filesystem every node can reach (or use it on a single
+    node). Claims run inside BEGIN IMMEDIATE transactions, so two workers can
+    never take the same job.
+    """
+
+    def __init__(self, path, poll_interval=1.0):
+        self.path = str(path)
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, payload, dedup_key=None):
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if dedup_key:
+                row = conn.execute(
+                    "SELECT job_id FROM jobs WHERE dedup_key = ? AND state IN ('queued', 'running') LIMIT 1",
+                    (dedup_key,),
+                ).fetchone()
+                if row:
+                    conn.execute('COMMIT')
+                    return row['job_id']
+            job_id = self.new_job_id()
+            conn.execute(
+                "INSERT INTO jobs (job_id, state, payload, dedup_key, enqueued_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), dedup_key, now, now),
+            )
+            conn.execute('COMMIT')
+            return job_id
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _claim_once(self, worker_id):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT job_id, payload FROM jobs WHERE state = 'queued' ORDER BY enqueued_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = 'running', worker = ?, updated_at = ? WHERE job_id = ?",
+                (worker_id, time.time(), row['job_id']),
+            )
+            conn.execute('COMMIT')
+            return row['job_id'], json.loads(row['payload'])
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def claim(self, worker_id, timeout=0):
+        deadline = time.time() + timeout
+        while True:
+            claimed = self._claim_once(worker_id)
+            if claimed or time.time() >= deadline:
+                return claimed
+            time.sleep(self.poll_interval)
+
+    def _update_owned(self, assignments, params, job_id, worker_id):
+        """UPDATE one job, only while worker_id (if given) still runs it"""
+        sql = f'UPDATE jobs SET {assignments} WHERE job_id = ?'
+        params = list(params) + [job_id]
+        if worker_id is not None:
+            sql += " AND worker = ? AND state = 'running'"
+            params.append(worker_id)
+        return self._connection().execute(sql, params).rowcount > 0
+
+    def heartbeat(self, job_id, progress=None, worker_id=None):
+        if progress is None:
+            return self._update_owned('updated_at = ?', (time.time(),), job_id, worker_id)
+        return self._update_owned(
+            'updated_at = ?, progress = ?', (time.time(), json.dumps(progress)), job_id, worker_id,
+        )
+
+    def complete(self, job_id, result, worker_id=None):
+        return self._update_owned(
+            "state = 'succeeded', result = ?, updated_at = ?", (json.dumps(result), time.time()), job_id, worker_id,
+        )
+
+    def fail(self, job_id, error, state='failed', worker_id=None):
+        return self._update_owned(
+            'state = ?, error = ?, updated_at = ?', (state, error, time.time()), job_id, worker_id,
+        )
+
+    def get_status(self, job_id):
+        row = self._connection().execute('SELECT * FROM jobs WHERE job_id = ?', (str(job_id),)).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row['job_id'],
+            'state': row['state'],
+            'payload': json.loads(row['payload']),
+            'worker': row['worker'],
+            'progress': json.loads(row['progress']) if row['progress'] else None,
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'enqueued_at': row['enqueued_at'],
+            'updated_at': row['updated_at'],
+        }
+
+    def queue_depth(self):
+        return self._connection().execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]
+
+    def requeue(self, job_id, worker_id=None):
+        sql = "UPDATE jobs SET state = 'queued', worker = NULL, updated_at = ? WHERE job_id = ? AND state = 'running'"
+        params = [time.time(), job_id]
+        if worker_id is not None:
+            sql += ' AND worker = ?'
+            params.append(worker_id)
+        return self._connection().execute(sql, params).rowcount > 0
+
+    def requeue_stale(self, timeout):
+        cursor = self._connection().execute(
+            "UPDATE jobs SET state = 'queued', worker = NULL, updated_at = ? WHERE state = 'running' AND updated_at < ?",
+            (time.time(), time.time() - timeout),
+        )
+        return cursor.rowcount
+
+    def cache_get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return json.loads(row['value']) if row else None
+
+    def cache_set(self, key, value, ttl):
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value), now + ttl),
+        )
+        conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
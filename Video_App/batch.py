@@ -0,0 +1,127 @@
+import os
+import json
+import zipfile
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class _ZipBuffer:
+    """Write-only sink for ZipFile that hands out what was written so far.
+
+    It has no seek(), so zipfile streams entries with data descriptors
+    instead of rewriting local headers.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _unique_name(name, used):
+    base, ext = os.path.splitext(name)
+    candidate = name
+    counter = 2
+    while candidate in used:
+        candidate = f"{base}_{counter}{ext}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+def stream_batch_zip(service, urls, quality=None, download_type='video', concurrency=3, rejected=None):
+    """Download urls in parallel and yield a ZIP archive as entries finish.
+
+    Entries are written in completion order. Items that fail, including
+    downloaded files that cannot be read, and any `rejected` {url: reason}
+    entries are recorded in a trailing manifest.json instead of aborting
+    the archive.
+    """
+    buffer = _ZipBuffer()
+    archive = zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True)
+    used_names = set()
+    manifest = [{'url': url, 'success': False, 'error': reason} for url, reason in (rejected or {}).items()]
+
+    def download(url):
+        try:
+            return service.download_video(url, quality=quality, download_type=download_type)
+        finally:
+            connection.close()
+
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='batch')
+    futures = {executor.submit(download, url): url for url in urls}
+    consumed = set()
+    try:
+        for future in as_completed(futures):
+            consumed.add(future)
+            url = futures[future]
+            try:
+                success, result, title = future.result()
+            except Exception as e:
+                success, result, title = False, f"An unexpected error occurred: {e}", None
+
+            if not success:
+                logger.warning(f"Batch item failed: {url}: {result}")
+                manifest.append({'url': url, 'success': False, 'error': result})
+                continue
+
+            arcname = _unique_name(os.path.basename(result), used_names)
+            try:
+                with open(result, 'rb') as src, archive.open(arcname, 'w', force_zip64=True) as dest:
+                    while True:
+                        chunk = src.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        dest.write(chunk)
+                        yield buffer.drain()
+                manifest.append({'url': url, 'success': True, 'filename': arcname, 'title': title})
+            except OSError as e:
+                # One unreadable file must not cost the client the rest of the archive
+                logger.warning(f"Batch item could not be archived: {url}: {e}")
+                entry = {'url': url, 'success': False, 'error': f"Could not read the downloaded file: {e}"}
+                if arcname in archive.namelist():
+                    # Failed mid-copy: the entry is in the archive, truncated
+                    entry['partial_filename'] = arcname
+                manifest.append(entry)
+            finally:
+                service.release_download(result)
+            yield buffer.drain()
+
+        archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+        archive.close()
+        yield buffer.drain()
+    finally:
+        # Client went away or we finished: drop queued items and release
+        # whatever running items produce once they complete.
+        executor.shutdown(wait=False, cancel_futures=True)
+        for future in futures:
+            if future not in consumed:
+                future.add_done_callback(lambda f: _release_result(service, f))
+
+
+def _release_result(service, future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    success, result, _ = future.result()
+    if success:
+        service.release_download(result)
@@ -0,0 +1,251 @@
+"""End-to-end benchmark harness running the real views offline.
+
+BenchEnvironment starts a MediaServer, registers FakeMediaIE and points the
+job backend and database at throwaway copies. Given proxy modes it also
+routes yt-dlp through a pool of StandInProxy servers. run_requests() then drives
+the downloader views through Django's test client from a pool of threads,
+the same code path a browser request takes minus the network socket, and
+summarize() turns the samples into requests/sec, latency percentiles,
+bytes/sec and peak RSS.
+"""
+import os
+import time
+import json
+import shutil
+import logging
+import resource
+import tempfile
+import threading
+from contextlib import contextmanager, redirect_stdout, redirect_stderr
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connections
+from django.test import Client
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from Video_App.backends import reset_backend
+from Video_App.proxies import ProxyPool
+from Video_App.views import downloader_service
+from .fake_extractor import FAKE_DOMAIN, fake_url, register
+from .http_proxy import StandInProxy
+from .media_server import MediaServer
+
+SCENARIOS = ('info', 'progressive', 'dash', 'audio')
+
+
+class BenchEnvironment:
+    """Media server, fake extractor, and isolated job backend and database"""
+
+    def __init__(self, bandwidth=0, latency=0.0, proxies=(), proxy_bandwidth=128 * 1024, **extractor_params):
+        self.server = MediaServer(bandwidth=bandwidth, latency=latency)
+        self.extractor_params = extractor_params
+        self.proxies = [StandInProxy(mode, bandwidth=proxy_bandwidth) for mode in proxies]
+        self.proxy_pool = None
+        self._previous_pool = None
+        self._workdir = None
+        self._settings = None
+        self._db_config = None
+
+    def __enter__(self):
+        self.server.start()
+        if self.proxies:
+            for proxy in self.proxies:
+                proxy.start()
+            self.proxy_pool = ProxyPool([proxy.url for proxy in self.proxies])
+            self._previous_pool, downloader_service.proxies = downloader_service.proxies, self.proxy_pool
+        register(self.server.base_url, **self.extractor_params)
+        self._workdir = tempfile.mkdtemp(prefix='speedy-bench-')
+        self._settings = override_settings(
+            EXTRA_SUPPORTED_DOMAINS=[FAKE_DOMAIN],
+            JOB_BACKEND='Video_App.backends.sqlite.SQLiteBackend',
+            JOB_BACKEND_OPTIONS={'path': os.path.join(self._workdir, 'jobs.sqlite3')},
+            DOWNLOAD_SERVE_BACKEND='python',
+            ALLOWED_HOSTS=['*'],
+        )
+        self._settings.enable()
+        reset_backend()
+        # Lets the harness read the error messages off failed downloads
+        setup_test_environment()
+        self._db_config = setup_databases(verbosity=0, interactive=False)
+        return self
+
+    def __exit__(self, *exc):
+        teardown_databases(self._db_config, verbosity=0)
+        teardown_test_environment()
+        self._settings.disable()
+        reset_backend()
+        if self.proxies:
+            downloader_service.proxies = self._previous_pool
+            for proxy in self.proxies:
+                proxy.stop()
+        self.server.stop()
+        shutil.rmtree(self._workdir, ignore_errors=True)
+
+
+class RSSSampler:
+    """Track the peak resident set size of this process while running"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    @staticmethod
+    def current():
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            # Lifetime peak, in KB on Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def scenario_form(scenario, url):
+    """POST data the index page sends to the youtube view for a scenario"""
+    if scenario == 'info':
+        return {'urlLink': url, 'action': 'get_info'}
+    data = {'urlLink': url, 'action': 'download'}
+    if scenario == 'progressive':
+        data.update(format_id='18', quality='360p (ready to download)')
+    elif scenario == 'dash':
+        data.update(format_id='137', quality='1080p (video + audio)')
+    elif scenario == 'audio':
+        data.update(quality='Audio Only (MP3)')
+    else:
+        raise ValueError(f'Unknown scenario {scenario}')
+    return data
+
+
+def perform(client, scenario, url):
+    """Run one request of a scenario; returns (ok, bytes received, error)"""
+    data = scenario_form(scenario, url)
+    if scenario == 'info':
+        response = client.post(reverse('youtube'), data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        body = response.content
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return False, len(body), f'HTTP {response.status_code}'
+        return bool(payload.get('success')), len(body), payload.get('error')
+
+    response = client.post(reverse('youtube'), data)
+    if not response.get('Content-Disposition', '').startswith('attachment'):
+        # Failures re-render the page with the error in the messages
+        messages = [str(m) for m in response.context['messages']] if response.context else []
+        return False, len(response.content), '; '.join(messages) or f'HTTP {response.status_code}'
+    received = 0
+    try:
+        for chunk in response.streaming_content:
+            received += len(chunk)
+    finally:
+        response.close()
+    return True, received, None
+
+
+def make_urls(count, pool_size=0, prefix='v'):
+    """`count` fake URLs: all distinct, or cycling through `pool_size` videos"""
+    run = f'{prefix}{int(time.time() * 1000) % 10 ** 8}'
+    if pool_size:
+        return [fake_url(f'{run}-{i % pool_size}') for i in range(count)]
+    return [fake_url(f'{run}-{i}') for i in range(count)]
+
+
+@contextmanager
+def quiet_output(verbose=False):
+    """Silence app logging and yt-dlp's console output unless verbose"""
+    if verbose:
+        yield
+        return
+    previous = logging.root.manager.disable
+    logging.disable(logging.CRITICAL)
+    try:
+        with open(os.devnull, 'w') as sink, redirect_stdout(sink), redirect_stderr(sink):
+            yield
+    finally:
+        logging.disable(previous)
+
+
+def run_requests(work, concurrency, verbose=False):
+    """Execute (scenario, url) items on `concurrency` threads.
+
+    Returns (samples, wall seconds, peak RSS bytes); each sample is a dict
+    with scenario, ok, latency, bytes and error.
+    """
+    local = threading.local()
+
+    def execute(item):
+        scenario, url = item
+        if not hasattr(local, 'client'):
+            local.client = Client(HTTP_HOST='localhost')
+        start = time.perf_counter()
+        try:
+            ok, received, error = perform(local.client, scenario, url)
+        except Exception as e:
+            ok, received, error = False, 0, f'{type(e).__name__}: {e}'
+        finally:
+            connections.close_all()
+        return {
+            'scenario': scenario,
+            'ok': ok,
+            'latency': time.perf_counter() - start,
+            'bytes': received,
+            'error': error,
+        }
+
+    with quiet_output(verbose), RSSSampler() as rss:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bench') as executor:
+            samples = list(executor.map(execute, work))
+        wall = time.perf_counter() - start
+    return samples, wall, rss.peak
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(samples, wall):
+    """Throughput and latency figures for a batch of samples"""
+    latencies = sorted(s['latency'] for s in samples)
+    ok = [s for s in samples if s['ok']]
+    errors = {}
+    for s in samples:
+        if not s['ok']:
+            # Group by the start of the message; the tail often names the file
+            key = (s['error'] or 'unknown')[:100]
+            errors[key] = errors.get(key, 0) + 1
+    total_bytes = sum(s['bytes'] for s in samples)
+    return {
+        'requests': len(samples),
+        'ok': len(ok),
+        'errors': len(samples) - len(ok),
+        'error_rate': round((len(samples) - len(ok)) / len(samples), 4) if samples else 0,
+        'requests_per_sec': round(len(samples) / wall, 2) if wall else None,
+        'p50': percentile(latencies, 0.50),
+        'p99': percentile(latencies, 0.99),
+        'max': latencies[-1] if latencies else None,
+        'bytes': total_bytes,
+        'bytes_per_sec': round(total_bytes / wall) if wall else None,
+        'top_errors': sorted(errors.items(), key=lambda item: -item[1])[:3],
+    }
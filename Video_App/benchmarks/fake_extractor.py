@@ -0,0 +1,109 @@
+"""A yt-dlp extractor for http://media.speedy.test/watch/<id> backed by MediaServer.
+
+Each video offers the shapes the format table has to handle: a progressive
+360p file, DASH video-only 720p/1080p streams split into segments, and an
+audio-only stream. register() puts the extractor ahead of yt-dlp's own so
+the real VideoDownloaderService resolves the fake URLs through it.
+"""
+import time
+from yt_dlp.extractor.common import InfoExtractor
+
+try:
+    from yt_dlp.extractor import import_extractors
+    from yt_dlp.globals import extractors as _extractors
+except ImportError:  # yt-dlp before 2025.01: a plain list of extractor classes
+    import_extractors = _extractors = None
+
+FAKE_DOMAIN = 'media.speedy.test'
+
+
+class FakeMediaIE(InfoExtractor):
+    IE_NAME = 'fakemedia'
+    _VALID_URL = r'https?://media\.speedy\.test/watch/(?P<id>[\w-]+)'
+
+    # Set by register()
+    server_url = None
+    duration = 120
+    extract_latency = 0.0
+    progressive_size = 4 * 1024 * 1024
+    video_size = 16 * 1024 * 1024
+    audio_size = 2 * 1024 * 1024
+    segments = 8
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        if self.extract_latency:
+            # Stands in for the platform API round trips of a real extractor
+            time.sleep(self.extract_latency)
+        media = f'{self.server_url}/media/{video_id}'
+
+        formats = [{
+            'format_id': '140',
+            'url': f'{media}/audio.m4a?size={self.audio_size}',
+            'ext': 'm4a',
+            'protocol': 'https',
+            'vcodec': 'none',
+            'acodec': 'mp4a.40.2',
+            'abr': 128,
+            'filesize': self.audio_size,
+        }, {
+            'format_id': '18',
+            'url': f'{media}/progressive.mp4?size={self.progressive_size}',
+            'ext': 'mp4',
+            'protocol': 'https',
+            'vcodec': 'avc1.42001E',
+            'acodec': 'mp4a.40.2',
+            'height': 360,
+            'width': 640,
+            'fps': 30,
+            'filesize': self.progressive_size,
+        }]
+        for format_id, height, width, scale in (('136', 720, 1280, 2), ('137', 1080, 1920, 1)):
+            size = self.video_size // scale
+            segment_size = max(1, size // self.segments)
+            formats.append({
+                'format_id': format_id,
+                'url': f'{media}/video/seg-0.m4s?size={segment_size}',
+                'fragment_base_url': f'{media}/video/',
+                'fragments': [
+                    {'path': f'seg-{n}.m4s?size={segment_size}'} for n in range(self.segments)
+                ],
+                'ext': 'mp4',
+                'protocol': 'http_dash_segments',
+                'vcodec': 'avc1.640028',
+                'acodec': 'none',
+                'height': height,
+                'width': width,
+                'fps': 30,
+                'filesize': segment_size * self.segments,
+            })
+
+        return {
+            'id': video_id,
+            'title': f'Benchmark video {video_id}',
+            'uploader': 'speedy-bench',
+            'duration': self.duration,
+            'thumbnail': f'{self.server_url}/thumb/{video_id}.jpg',
+            'formats': formats,
+        }
+
+
+def register(server_url, **params):
+    """Route media.speedy.test URLs to FakeMediaIE, serving from server_url"""
+    FakeMediaIE.server_url = server_url.rstrip('/')
+    for name, value in params.items():
+        if value is not None:
+            setattr(FakeMediaIE, name, value)
+    if _extractors is None:
+        from yt_dlp.extractor import extractors
+        if FakeMediaIE not in extractors._ALL_CLASSES:
+            extractors._ALL_CLASSES.insert(0, FakeMediaIE)
+            extractors.FakeMediaIE = FakeMediaIE
+        return
+    import_extractors()
+    if 'FakeMediaIE' not in _extractors.value:
+        _extractors.value = {'FakeMediaIE': FakeMediaIE, **_extractors.value}
+
+
+def fake_url(video_id):
+    return f'http://{FAKE_DOMAIN}/watch/{video_id}'
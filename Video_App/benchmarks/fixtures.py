@@ -0,0 +1,91 @@
+"""yt-dlp format lists for the format table tests and benchmarks.
+
+Recorded lists live in Video_App/testdata/formats as JSON, each with the
+table build_format_table is expected to produce for it. The generated lists
+below scale the same shapes up for benchmarking. The shapes follow what yt-dlp reports for YouTube: storyboards, audio-only
+DASH (m4a/opus), video-only DASH in several codecs and frame rates, HLS
+variants and a couple of progressive formats. Live replays with several
+camera angles repeat the whole ladder once per angle.
+"""
+import os
+import json
+import random
+
+RECORDED_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'testdata', 'formats')
+
+HEIGHTS = [144, 240, 360, 480, 720, 1080, 1440, 2160]
+WIDTHS = {144: 256, 240: 426, 360: 640, 480: 854, 720: 1280, 1080: 1920, 1440: 2560, 2160: 3840}
+VIDEO_CODECS = ['avc1.4d401e', 'vp09.00.40.08', 'av01.0.08M.08']
+AUDIO_CODECS = [('m4a', 'mp4a.40.2', 129), ('webm', 'opus', 160), ('m4a', 'mp4a.40.5', 48), ('webm', 'opus', 70)]
+
+
+def make_formats(angles=1, duration=600, seed=0):
+    """Build one format list; `angles` multiplies the video ladder"""
+    rng = random.Random(seed)
+    formats = []
+
+    for i in range(4):
+        formats.append({
+            'format_id': f'sb{i}', 'ext': 'mhtml', 'protocol': 'mhtml',
+            'vcodec': 'none', 'acodec': 'none', 'height': 45 * (i + 1), 'width': 80 * (i + 1),
+        })
+
+    for idx, (ext, acodec, abr) in enumerate(AUDIO_CODECS):
+        formats.append({
+            'format_id': f'{139 + idx}', 'ext': ext, 'protocol': 'https',
+            'vcodec': 'none', 'acodec': acodec, 'abr': abr,
+            'filesize': int(abr * 1000 / 8 * duration * rng.uniform(0.95, 1.05)),
+        })
+
+    for angle in range(angles):
+        for height in HEIGHTS:
+            for fps in (30, 60) if height >= 720 else (30,):
+                for codec in VIDEO_CODECS:
+                    tbr = height * (4 if fps == 60 else 2.5) * rng.uniform(0.8, 1.2)
+                    size = int(tbr * 1000 / 8 * duration)
+                    fmt = {
+                        'format_id': f'{angle}-{height}-{fps}-{codec.split(".")[0]}',
+                        'ext': 'mp4' if codec.startswith('avc') else 'webm',
+                        'protocol': 'https',
+                        'vcodec': codec, 'acodec': 'none',
+                        'height': height, 'width': WIDTHS[height], 'fps': fps,
+                        'tbr': tbr,
+                    }
+                    # yt-dlp often only has an approximate size for DASH
+                    fmt['filesize' if rng.random() < 0.5 else 'filesize_approx'] = size
+                    formats.append(fmt)
+                formats.append({
+                    'format_id': f'hls-{angle}-{height}-{fps}',
+                    'ext': 'mp4', 'protocol': 'm3u8_native',
+                    'vcodec': 'avc1.64001f', 'acodec': 'mp4a.40.2',
+                    'height': height, 'width': WIDTHS[height], 'fps': fps,
+                })
+
+    formats.append({
+        'format_id': '18', 'ext': 'mp4', 'protocol': 'https',
+        'vcodec': 'avc1.42001E', 'acodec': 'mp4a.40.2',
+        'height': 360, 'width': 640, 'fps': 30, 'filesize': 300 * duration * 100,
+    })
+    return formats
+
+
+FIXTURES = {
+    'short_clip': dict(angles=1, duration=60),
+    'vod': dict(angles=3, duration=3600),
+    'live_replay': dict(angles=12, duration=4 * 3600),
+    'multi_speaker_replay': dict(angles=40, duration=6 * 3600),
+}
+
+
+def load_fixtures():
+    return {name: make_formats(**params) for name, params in FIXTURES.items()}
+
+
+def load_recorded():
+    """Recorded format lists with their expected tables, keyed by name"""
+    recorded = {}
+    for name in sorted(os.listdir(RECORDED_DIR)):
+        if name.endswith('.json'):
+            with open(os.path.join(RECORDED_DIR, name), encoding='utf-8') as f:
+                recorded[name[:-5]] = json.load(f)
+    return recorded
@@ -0,0 +1,127 @@
+"""Local stand-in for an egress proxy, for exercising ProxyPool offline.
+
+StandInProxy forwards plain-HTTP proxy requests (absolute-URI GET/HEAD,
+which is how yt-dlp talks to an http:// proxy) to the target, typically the
+MediaServer, in one of these modes:
+
+    ok        forward at full speed
+    slow      forward at `bandwidth` bytes/s (default 128 KB/s)
+    banned    answer 429 Too Many Requests, like a platform blocking the IP
+    forbidden answer 403 Forbidden (charged to the proxy only once every
+              format of a download has been refused)
+    broken    close the connection without answering
+"""
+import time
+import http.client
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+MODES = ('ok', 'slow', 'banned', 'forbidden', 'broken')
+CHUNK_SIZE = 64 * 1024
+HOP_BY_HOP = {'connection', 'keep-alive', 'proxy-connection', 'proxy-authorization', 'te', 'trailer',
+              'transfer-encoding', 'upgrade'}
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._forward(head=True)
+
+    def do_GET(self):
+        self._forward(head=False)
+
+    def _forward(self, head):
+        server = self.server
+        server.count_request()
+        if server.mode == 'broken':
+            self.close_connection = True
+            return
+        if server.mode in ('banned', 'forbidden'):
+            status = 429 if server.mode == 'banned' else 403
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        target = urlsplit(self.path)
+        if target.scheme != 'http' or not target.hostname:
+            self.send_error(400, 'Only absolute http:// URLs are proxied')
+            return
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_BY_HOP}
+        connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        try:
+            path = target.path + (f'?{target.query}' if target.query else '')
+            connection.request('HEAD' if head else 'GET', path or '/', headers=headers)
+            upstream = connection.getresponse()
+            self.send_response(upstream.status)
+            for name, value in upstream.getheaders():
+                if name.lower() not in HOP_BY_HOP:
+                    self.send_header(name, value)
+            self.end_headers()
+            if head:
+                return
+            self._relay(upstream)
+        except (OSError, http.client.HTTPException):
+            self.close_connection = True
+        finally:
+            connection.close()
+
+    def _relay(self, upstream):
+        bandwidth = self.server.bandwidth if self.server.mode == 'slow' else 0
+        sent = 0
+        began = time.monotonic()
+        while True:
+            chunk = upstream.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            if bandwidth:
+                ahead = sent / bandwidth - (time.monotonic() - began)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+
+class StandInProxy(ThreadingHTTPServer):
+    """Threaded forwarding proxy in one of MODES; use as a context manager"""
+
+    daemon_threads = True
+
+    def __init__(self, mode='ok', bandwidth=128 * 1024, host='127.0.0.1', port=0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown proxy mode '{mode}' (choose from {', '.join(MODES)})")
+        super().__init__((host, port), _ProxyHandler)
+        self.mode = mode
+        self.bandwidth = bandwidth
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name=f'proxy-{self.mode}', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,257 @@
+"""Closed-loop load generator replaying a traffic mix over real HTTP.
+
+By default the app is served in-process by LiveServer, a WSGI server
+with a fixed pool of request threads like a production worker, so requests
+queue once the pool is busy; any running deployment can be targeted
+instead. Each virtual user loads the index page for a CSRF cookie, then
+loops: pick a scenario from the mix, pick a hot (repeated) or new video,
+send the request and read the whole response. Slow users read downloads
+at a capped rate, holding a server thread the way a phone on a bad
+network does.
+"""
+import json
+import time
+import random
+import socket
+import threading
+import urllib.error
+import urllib.request
+from http.cookiejar import CookieJar
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from django.core.servers.basehttp import WSGIRequestHandler, WSGIServer
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+
+from .e2e import SCENARIOS, percentile, scenario_form, summarize
+from .fake_extractor import fake_url
+
+READ_CHUNK = 64 * 1024
+
+
+class _QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LiveServer(WSGIServer):
+    """The Django app on an ephemeral port with `threads` request threads"""
+
+    request_queue_size = 1024
+
+    def __init__(self, threads=8, host='127.0.0.1'):
+        super().__init__((host, 0), _QuietHandler)
+        self.set_app(get_wsgi_application())
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            pass
+        finally:
+            self.shutdown_request(request)
+            connections.close_all()
+
+    def handle_error(self, request, client_address):
+        pass
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='live-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_mix(spec):
+    """'info=60,progressive=30,audio=10' -> {'info': 60.0, ...}"""
+    mix = {}
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError('The traffic mix is empty')
+    return mix
+
+
+class VirtualUser:
+    """One browser session: cookie jar, CSRF token and a read-rate cap"""
+
+    def __init__(self, base_url, read_rate=0, timeout=300):
+        self.base_url = base_url
+        self.read_rate = read_rate
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+        self.csrf_token = None
+
+    def _ensure_csrf(self):
+        if self.csrf_token:
+            return
+        with self.opener.open(self.base_url + '/', timeout=self.timeout) as response:
+            response.read()
+        self.csrf_token = next((c.value for c in self.cookies if c.name == 'csrftoken'), None)
+
+    def request(self, scenario, url):
+        """Returns a sample dict: scenario, ok, latency, ttfb, bytes, error"""
+        sample = {'scenario': scenario, 'ok': False, 'latency': 0.0, 'ttfb': None, 'bytes': 0, 'error': None}
+        start = time.perf_counter()
+        try:
+            self._ensure_csrf()
+            request = urllib.request.Request(
+                self.base_url + '/youtube',
+                data=urlencode(scenario_form(scenario, url)).encode(),
+                headers={
+                    'X-CSRFToken': self.csrf_token or '',
+                    'Referer': self.base_url + '/',
+                    **({'X-Requested-With': 'XMLHttpRequest'} if scenario == 'info' else {}),
+                },
+            )
+            with self.opener.open(request, timeout=self.timeout) as response:
+                sample['ttfb'] = time.perf_counter() - start
+                is_file = response.headers.get('Content-Disposition', '').startswith('attachment')
+                body, sample['bytes'] = self._read(response, throttle=is_file)
+            if scenario == 'info':
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    payload = {'error': 'invalid JSON response'}
+                sample['ok'] = bool(payload.get('success'))
+                sample['error'] = None if sample['ok'] else str(payload.get('error'))[:100]
+            else:
+                sample['ok'] = is_file
+                # Failed downloads re-render the page instead of sending a file
+                sample['error'] = None if is_file else 'download failed (error page)'
+        except urllib.error.HTTPError as e:
+            sample['error'] = f'HTTP {e.code}'
+        except (urllib.error.URLError, socket.timeout, ConnectionError) as e:
+            sample['error'] = f'{type(e).__name__}: {getattr(e, "reason", e)}'
+        sample['latency'] = time.perf_counter() - start
+        return sample
+
+    def _read(self, response, throttle):
+        """Returns (body, size); files are only counted, and read slowly if capped"""
+        if not throttle:
+            body = response.read()
+            return body, len(body)
+        received = 0
+        began = time.monotonic()
+        while True:
+            chunk = response.read(READ_CHUNK)
+            if not chunk:
+                return b'', received
+            received += len(chunk)
+            if self.read_rate:
+                ahead = received / self.read_rate - (time.monotonic() - began)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+
+def run_step(base_url, users, duration, mix, hot_ratio=0.5, hot_videos=20,
+             slow_ratio=0.0, slow_rate=256 * 1024, seed=0, run_id='lt', videos=None):
+    """Run `users` closed-loop users for `duration` seconds; returns (samples, wall).
+
+    Requests name fake-extractor videos unless `videos` lists real video
+    URLs; then the first `hot_videos` of them are the hot set and the rest
+    are cycled through as new videos.
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    deadline = time.monotonic() + duration
+    slow_users = int(round(users * slow_ratio))
+    samples = []
+    lock = threading.Lock()
+
+    def user_loop(index):
+        rng = random.Random(f'{seed}-{users}-{index}')
+        user = VirtualUser(base_url, read_rate=slow_rate if index < slow_users else 0)
+        n = 0
+        while time.monotonic() < deadline:
+            scenario = rng.choices(names, weights)[0]
+            hot = rng.random() < hot_ratio
+            if videos:
+                cold = videos[hot_videos:] or videos
+                url = rng.choice(videos[:hot_videos]) if hot else cold[(index + n * users) % len(cold)]
+            elif hot:
+                url = fake_url(f'{run_id}-hot-{rng.randrange(hot_videos)}')
+            else:
+                url = fake_url(f'{run_id}-u{users}-{index}-{n}')
+            n += 1
+            sample = user.request(scenario, url)
+            sample['slow_client'] = index < slow_users
+            with lock:
+                samples.append(sample)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user_loop, args=(i,), name=f'user-{i}', daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+def step_report(users, samples, wall):
+    """Summary of one load step, adding p95, time to first byte and per-scenario figures"""
+    report = summarize(samples, wall)
+    # Slow users' latency is mostly their own read time; the percentiles
+    # show what they do to everyone else
+    fast = [s for s in samples if not s.get('slow_client')] or samples
+    latencies = sorted(s['latency'] for s in fast)
+    ttfbs = sorted(s['ttfb'] for s in fast if s['ttfb'] is not None)
+    slow = sorted(s['latency'] for s in samples if s.get('slow_client'))
+    report.update(
+        users=users,
+        p50=percentile(latencies, 0.50),
+        p95=percentile(latencies, 0.95),
+        p99=percentile(latencies, 0.99),
+        max=latencies[-1] if latencies else None,
+        slow_client_p99=percentile(slow, 0.99),
+        ttfb_p99=percentile(ttfbs, 0.99),
+        by_scenario={
+            name: summarize([s for s in samples if s['scenario'] == name], wall)
+            for name in sorted({s['scenario'] for s in samples})
+        },
+    )
+    return report
+
+
+def find_saturation(reports, slo=5.0, min_gain=0.1, max_error_increase=0.05):
+    """Index of the first step past the knee, and why; (None, None) if none.
+
+    A step is saturated when adding users stopped buying throughput (less
+    than `min_gain` more req/s than the previous step), p99 latency broke
+    the `slo`, or the error rate rose by more than `max_error_increase`
+    over the lightest step.
+    """
+    if not reports:
+        return None, None
+    base_errors = reports[0]['error_rate']
+    for i, report in enumerate(reports):
+        if report['p99'] is not None and report['p99'] > slo:
+            return i, f"p99 {report['p99']:.2f}s over the {slo}s SLO"
+        if report['error_rate'] - base_errors > max_error_increase:
+            return i, f"error rate {report['error_rate']:.1%} (was {base_errors:.1%})"
+        if i and reports[i - 1]['requests_per_sec'] and (
+                report['requests_per_sec'] < reports[i - 1]['requests_per_sec'] * (1 + min_gain)):
+            return i, f"throughput flat ({reports[i - 1]['requests_per_sec']} -> {report['requests_per_sec']} req/s)"
+    return None, None
@@ -0,0 +1,157 @@
+"""Local HTTP server serving synthetic media for offline benchmarks.
+
+Paths (the size query parameter sets the body length in bytes):
+
+    /media/<video_id>/progressive.mp4?size=N   combined video+audio file
+    /media/<video_id>/audio.m4a?size=N         audio-only stream
+    /media/<video_id>/video/seg-<n>.m4s?size=N one DASH video segment
+    /thumb/<video_id>.jpg                      small thumbnail
+
+Bodies are deterministic filler bytes, not decodable media. Range requests
+are honoured the way CDNs do for yt-dlp's chunked HTTP downloads. Every
+response waits `latency` seconds before its headers and is written at no
+more than `bandwidth` bytes/s per connection (0 = unlimited).
+"""
+import re
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+CHUNK_SIZE = 64 * 1024
+FILLER = random.Random(0).randbytes(1024 * 1024)
+THUMBNAIL_BYTES = 16 * 1024
+
+CONTENT_TYPES = {
+    'mp4': 'video/mp4',
+    'm4a': 'audio/mp4',
+    'm4s': 'video/iso.segment',
+    'jpg': 'image/jpeg',
+}
+
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+def _filler(start, length):
+    """`length` bytes of the repeating filler pattern starting at offset `start`"""
+    out = bytearray()
+    offset = start % len(FILLER)
+    while len(out) < length:
+        out += FILLER[offset:offset + length - len(out)]
+        offset = 0
+    return bytes(out)
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def _serve(self, head):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        if parsed.path.startswith('/thumb/'):
+            size = THUMBNAIL_BYTES
+        elif parsed.path.startswith('/media/'):
+            try:
+                size = int(query.get('size', ['0'])[0])
+            except ValueError:
+                size = -1
+        else:
+            size = -1
+        if size < 0:
+            self.send_error(404)
+            return
+
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        start, end, status = 0, size - 1, 200
+        match = RANGE_RE.fullmatch(self.headers.get('Range', '').strip())
+        if match and size:
+            first, last = match.groups()
+            if first:
+                start, end = int(first), min(int(last), size - 1) if last else size - 1
+            elif last:
+                start, end = max(0, size - int(last)), size - 1
+            if start >= size or start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = 206
+
+        ext = parsed.path.rsplit('.', 1)[-1]
+        length = max(0, end - start + 1)
+        self.send_response(status)
+        self.send_header('Content-Type', CONTENT_TYPES.get(ext, 'application/octet-stream'))
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+        if head:
+            return
+
+        sent = 0
+        began = time.monotonic()
+        try:
+            while sent < length:
+                chunk = _filler(start + sent, min(CHUNK_SIZE, length - sent))
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                server.count_bytes(len(chunk))
+                if server.bandwidth:
+                    ahead = sent / server.bandwidth - (time.monotonic() - began)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class MediaServer(ThreadingHTTPServer):
+    """Threaded synthetic media server; use as a context manager"""
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, bandwidth=0, latency=0.0):
+        super().__init__((host, port), _MediaHandler)
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.bytes_sent = 0
+        self._bytes_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count_bytes(self, amount):
+        with self._bytes_lock:
+            self.bytes_sent += amount
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='media-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import shutil
+import signal
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from yt_dlp.utils import DownloadCancelled
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+class DrainCancelled(DownloadCancelled):
+    """Raised from a progress hook when a drain deadline interrupts a download"""
+
+
+class DrainController:
+    """Graceful shutdown for in-flight downloads.
+
+    On SIGTERM the node turns unready (readiness probe and new work answer
+    503) while running downloads carry on. Once they finish, or after
+    DRAIN_TIMEOUT seconds, the previously installed handler runs (the
+    server's own graceful stop, or the default terminate). Downloads still
+    running at the deadline are interrupted from their progress hook and
+    their partial files are checkpointed to DRAIN_CHECKPOINT_DIR; the next
+    request for the same video and format resumes from them instead of
+    starting over.
+    """
+
+    def __init__(self):
+        self.timeout = getattr(settings, 'DRAIN_TIMEOUT', 120)
+        self.abort_grace = getattr(settings, 'DRAIN_ABORT_GRACE', 15)
+        self.checkpoint_dir = getattr(settings, 'DRAIN_CHECKPOINT_DIR', os.path.join(settings.MEDIA_ROOT, 'checkpoints'))
+        self.checkpoint_ttl = getattr(settings, 'DRAIN_CHECKPOINT_TTL', 24 * 3600)
+
+        self._draining = threading.Event()
+        self._abort = threading.Event()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._previous = {}
+        self._finished = set()
+        self.draining_since = None
+
+    @property
+    def draining(self):
+        return self._draining.is_set()
+
+    @property
+    def aborting(self):
+        return self._abort.is_set()
+
+    def install(self, signals=(signal.SIGTERM,)):
+        """Install the drain handler, keeping the current one to chain to"""
+        for signum in signals:
+            try:
+                self._previous[signum] = signal.getsignal(signum)
+                signal.signal(signum, self._handle_signal)
+            except ValueError:
+                # Not the main thread of the main interpreter
+                logger.debug(f"Cannot install drain handler for signal {signum} here")
+
+    def _handle_signal(self, signum, frame):
+        if signum in self._finished:
+            # Re-delivered by _finish: hand over to the previous handler
+            self._chain(signum, frame)
+            return
+        if self.draining:
+            # A second signal cuts the drain short
+            logger.warning("Second shutdown signal: interrupting downloads now")
+            self._abort.set()
+            return
+        self.start_drain()
+        threading.Thread(target=self._finish, args=(signum,), name='drain', daemon=True).start()
+
+    def start_drain(self):
+        if not self._draining.is_set():
+            self.draining_since = time.time()
+            self._draining.set()
+            logger.info(f"Draining: {self.in_flight()} download(s) in flight, deadline {self.timeout}s")
+
+    def interrupt(self):
+        """Drain and interrupt running downloads at once (e.g. on Ctrl-C)"""
+        self.start_drain()
+        self._abort.set()
+
+    def _finish(self, signum):
+        if not self.wait_idle(self.timeout):
+            logger.warning(f"Drain deadline reached with {self.in_flight()} download(s) running; checkpointing them")
+            self._abort.set()
+            self.wait_idle(self.abort_grace)
+        logger.info("Drain complete")
+        # Handlers can only be swapped on the main thread: send the signal
+        # again and let _handle_signal chain from there
+        self._finished.add(signum)
+        os.kill(os.getpid(), signum)
+
+    def _chain(self, signum, frame):
+        """Restore the previous handler and pass the signal on to it (main thread only)"""
+        previous = self._previous.get(signum)
+        if previous is None:
+            # Installed outside Python; the default action is the best guess
+            previous = signal.SIG_DFL
+        signal.signal(signum, previous)
+        if callable(previous):
+            previous(signum, frame)
+        elif previous == signal.SIG_DFL:
+            signal.raise_signal(signum)
+
+    @contextmanager
+    def track(self):
+        """Count the block as in-flight work the drain waits for"""
+        with self._cond:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def in_flight(self):
+        with self._cond:
+            return self._in_flight
+
+    def wait_idle(self, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def abort_hook(self):
+        """yt-dlp progress hook that stops a download once the drain deadline passes"""
+        def hook(d):
+            if self._abort.is_set():
+                raise DrainCancelled('Server is shutting down')
+        return hook
+
+    def status(self):
+        return {
+            'state': 'draining' if self.draining else 'serving',
+            'in_flight': self.in_flight(),
+            'draining_since': self.draining_since,
+        }
+
+    def _checkpoint_path(self, key):
+        return os.path.join(self.checkpoint_dir, hashlib.sha1('\0'.join(key).encode()).hexdigest())
+
+    def checkpoint(self, key, temp_dir, **metadata):
+        """Move the partial files of an interrupted download out of scratch"""
+        target = self._checkpoint_path(key)
+        try:
+            shutil.rmtree(target, ignore_errors=True)
+            os.makedirs(target)
+            kept = 0
+            for name in os.listdir(temp_dir):
+                if name.startswith('.'):
+                    continue
+                shutil.move(os.path.join(temp_dir, name), os.path.join(target, name))
+                kept += 1
+            with open(os.path.join(target, CHECKPOINT_FILE), 'w') as f:
+                json.dump(dict(metadata, key=list(key), created=time.time()), f)
+            logger.info(f"Checkpointed {kept} partial file(s) of {key[1]} to {target}")
+        except OSError as e:
+            logger.warning(f"Failed to checkpoint {key[1]}: {e}")
+            shutil.rmtree(target, ignore_errors=True)
+
+    def restore(self, key, temp_dir):
+        """Move a checkpoint's partial files into temp_dir; True if one existed"""
+        source = self._checkpoint_path(key)
+        if not os.path.isdir(source):
+            return False
+        try:
+            with open(os.path.join(source, CHECKPOINT_FILE)) as f:
+                created = json.load(f).get('created', 0)
+            if time.time() - created > self.checkpoint_ttl:
+                shutil.rmtree(source, ignore_errors=True)
+                return False
+            for name in os.listdir(source):
+                if name != CHECKPOINT_FILE:
+                    shutil.move(os.path.join(source, name), os.path.join(temp_dir, name))
+            logger.info(f"Resuming {key[1]} from checkpoint")
+            return True
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to restore checkpoint for {key[1]}: {e}")
+            return False
+        finally:
+            shutil.rmtree(source, ignore_errors=True)
+
+    def evict_checkpoints(self):
+        """Remove checkpoints nobody resumed within DRAIN_CHECKPOINT_TTL"""
+        if not os.path.isdir(self.checkpoint_dir):
+            return 0
+        evicted = 0
+        now = time.time()
+        for entry in os.listdir(self.checkpoint_dir):
+            path = os.path.join(self.checkpoint_dir, entry)
+            try:
+                if now - os.path.getmtime(path) > self.checkpoint_ttl:
+                    shutil.rmtree(path, ignore_errors=True)
+                    evicted += 1
+            except OSError:
+                pass
+        return evicted
+
+
+drain_controller = DrainController()
+
+
+def install_drain_handler():
+    """Drain on SIGTERM in this process if DRAIN_ON_SIGTERM is set.
+
+    Called by the WSGI/ASGI entry points and run_worker only, so other
+    management commands (migrate, shell, ...) keep the default handler.
+    """
+    if getattr(settings, 'DRAIN_ON_SIGTERM', True):
+        drain_controller.install()
@@ -0,0 +1,225 @@
+ONE_MB = 1024 * 1024
+LARGE_FILE_BYTES = 1024 * 1024 * 1024  # > 1GB
+
+
+def get_quality_category(height):
+    """Categorize video quality based on height"""
+    if height >= 2160:
+        return '4K'
+    elif height >= 1440:
+        return '2K'
+    elif height >= 1080:
+        return 'Full HD'
+    elif height >= 720:
+        return 'HD'
+    elif height >= 480:
+        return 'SD'
+    else:
+        return 'Low'
+
+
+class FormatRecord:
+    """One downloadable option offered to the user.
+
+    Records are kept compact while the format table is built; the dict form
+    (including the display-only filesize_mb string) is produced by
+    to_dict() at the response or cache edge.
+    """
+
+    __slots__ = (
+        'format_id', 'quality', 'height', 'width', 'fps', 'ext', 'vcodec',
+        'acodec', 'has_audio', 'filesize', 'category', 'note', 'protocol',
+        'will_merge', 'is_large',
+    )
+
+    FIELDS = __slots__ + ('filesize_mb',)
+
+    def __init__(self, format_id, quality, height, width, fps, ext, vcodec, acodec,
+                 has_audio, filesize, category, note, protocol, will_merge, is_large):
+        self.format_id = format_id
+        self.quality = quality
+        self.height = height
+        self.width = width
+        self.fps = fps
+        self.ext = ext
+        self.vcodec = vcodec
+        self.acodec = acodec
+        self.has_audio = has_audio
+        self.filesize = filesize
+        self.category = category
+        self.note = note
+        self.protocol = protocol
+        self.will_merge = will_merge
+        self.is_large = is_large
+
+    @property
+    def filesize_mb(self):
+        return f"{round(self.filesize / ONE_MB, 1)} MB" if self.filesize else "Unknown"
+
+    def to_dict(self, fields=None):
+        if fields:
+            return {name: getattr(self, name) for name in fields if name in self.FIELDS}
+        return {
+            'format_id': self.format_id,
+            'quality': self.quality,
+            'height': self.height,
+            'width': self.width,
+            'fps': self.fps,
+            'ext': self.ext,
+            'vcodec': self.vcodec,
+            'acodec': self.acodec,
+            'has_audio': self.has_audio,
+            'filesize': self.filesize,
+            'filesize_mb': self.filesize_mb,
+            'category': self.category,
+            'note': self.note,
+            'protocol': self.protocol,
+            'will_merge': self.will_merge,
+            'is_large': self.is_large,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(*(data.get(name) for name in cls.__slots__))
+
+    def __repr__(self):
+        return f"<FormatRecord {self.format_id} {self.quality}>"
+
+
+def _quality_id(height, fps):
+    quality_id = f"{height}p"
+    if fps > 30:
+        quality_id += f"{fps}"
+    return quality_id
+
+
+def build_format_table(formats):
+    """Bucket yt-dlp formats into the options offered to the user.
+
+    A single pass keeps, per quality label, the best combined (video+audio)
+    format and the best video-only format, plus the best audio-only format.
+    Only the handful of bucket winners are sorted afterwards.
+    """
+    combined = {}
+    video_only = {}
+    best_audio = None
+    best_abr = None
+
+    for f in formats:
+        vcodec = f.get('vcodec', 'none')
+        acodec = f.get('acodec', 'none')
+        height = f.get('height')
+
+        if vcodec != 'none' and acodec != 'none' and height:
+            if height <= 0:
+                continue
+            bucket = combined
+        elif vcodec != 'none' and height and isinstance(height, (int, float)) and height > 0:
+            # Skip problematic formats
+            if f.get('protocol', '') == 'm3u8_native' and 'hls' in f.get('format_id', ''):
+                continue
+            bucket = video_only
+        elif acodec != 'none' and vcodec == 'none':
+            abr = f.get('abr', 0) or 0
+            if best_abr is None or abr > best_abr:
+                best_audio, best_abr = f, abr
+            continue
+        else:
+            continue
+
+        # One bucket per quality label (height, plus fps above 30); the
+        # highest (height, fps) wins and ties keep the first format seen
+        fps = f.get('fps') or 0
+        label = (height, fps if fps > 30 else 0)
+        key = (height, fps)
+        current = bucket.get(label)
+        if current is None or key > current[0]:
+            bucket[label] = (key, f)
+
+    records = []
+    for _, fmt in sorted(combined.values(), key=lambda item: item[0], reverse=True):
+        height = fmt['height']
+        quality_id = _quality_id(height, fmt.get('fps') or 30)
+        filesize = fmt.get('filesize') or fmt.get('filesize_approx')
+        records.append(FormatRecord(
+            fmt.get('format_id'),
+            f"{quality_id} (ready to download)",
+            height,
+            fmt.get('width') or 0,
+            fmt.get('fps') or 30,
+            fmt.get('ext', 'mp4'),
+            fmt.get('vcodec', 'unknown'),
+            fmt.get('acodec', 'unknown'),
+            True,
+            filesize,
+            get_quality_category(height),
+            "Complete video with audio - no merging needed",
+            fmt.get('protocol', 'https'),
+            False,
+            bool(filesize and filesize > LARGE_FILE_BYTES),
+        ))
+
+    audio_size = best_audio.get('filesize') if best_audio else None
+    for label, (_, fmt) in sorted(video_only.items(), key=lambda item: item[1][0], reverse=True):
+        # Skip if we already have this quality from combined formats
+        if label in combined:
+            continue
+
+        height = fmt['height']
+        quality_id = _quality_id(height, fmt.get('fps') or 30)
+        video_filesize = fmt.get('filesize') or fmt.get('filesize_approx')
+
+        # Calculate estimated combined size
+        estimated_size = None
+        if video_filesize and audio_size:
+            estimated_size = video_filesize + audio_size
+        elif video_filesize:
+            estimated_size = int(video_filesize * 1.1)
+        is_large = bool(estimated_size and estimated_size > LARGE_FILE_BYTES)
+
+        # Add warning for large files
+        quality_display = f"{quality_id} (video + audio)"
+        note = "Video will be merged with audio"
+        if is_large:
+            quality_display += " ⚠️"
+            note += " - Large file, merging may take time"
+
+        records.append(FormatRecord(
+            fmt.get('format_id'),
+            quality_display,
+            height,
+            fmt.get('width') or 0,
+            fmt.get('fps') or 30,
+            'mp4',
+            fmt.get('vcodec', 'unknown'),
+            'merged',
+            False,
+            estimated_size,
+            get_quality_category(height),
+            note,
+            fmt.get('protocol', 'https'),
+            True,
+            is_large,
+        ))
+
+    # Add audio-only option
+    if best_audio is not None:
+        records.append(FormatRecord(
+            best_audio.get('format_id'),
+            'Audio Only (MP3)',
+            0,
+            0,
+            0,
+            'mp3',
+            'none',
+            best_audio.get('acodec', 'unknown'),
+            True,
+            audio_size,
+            'Audio',
+            'Audio only - converted to MP3',
+            best_audio.get('protocol', 'https'),
+            False,
+            False,
+        ))
+
+    return records
@@ -0,0 +1,99 @@
+import json
+import shutil
+from django.core.management.base import BaseCommand, CommandError
+
+from Video_App.benchmarks.e2e import SCENARIOS, BenchEnvironment, make_urls, run_requests, summarize
+from Video_App.benchmarks.http_proxy import MODES as PROXY_MODES
+
+MB = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = 'Offline end-to-end benchmark of the downloader views against a local fake media server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help='Scenario to run (repeatable; default: all)')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--url-pool', type=int, default=0,
+                            help='Cycle through this many videos (0 = every request is a new video)')
+        parser.add_argument('--bandwidth', type=float, default=0, help='Server MB/s per connection (0 = unlimited)')
+        parser.add_argument('--latency', type=float, default=0.0, help='Server delay before each response, seconds')
+        parser.add_argument('--extract-latency', type=float, default=0.0, help='Simulated platform API time per extraction')
+        parser.add_argument('--progressive-mb', type=float, default=4)
+        parser.add_argument('--video-mb', type=float, default=16)
+        parser.add_argument('--audio-mb', type=float, default=2)
+        parser.add_argument('--segments', type=int, default=8, help='DASH segments per video stream')
+        parser.add_argument('--proxies', default='',
+                            help=f"Route yt-dlp through stand-in egress proxies, e.g. ok,ok,slow,banned "
+                                 f"(modes: {', '.join(PROXY_MODES)})")
+        parser.add_argument('--proxy-bandwidth', type=float, default=0.125, help='MB/s of the slow proxies')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+        parser.add_argument('--verbose', action='store_true', help='Keep app and yt-dlp output')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenario'] or list(SCENARIOS)
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+        proxies = [mode.strip() for mode in options['proxies'].split(',') if mode.strip()]
+        unknown = [mode for mode in proxies if mode not in PROXY_MODES]
+        if unknown:
+            raise CommandError(f"Unknown proxy mode(s): {', '.join(unknown)}")
+        if not shutil.which('ffmpeg'):
+            self.stderr.write('ffmpeg not found: the dash (merge) and audio (MP3) scenarios will fail')
+
+        environment = BenchEnvironment(
+            bandwidth=int(options['bandwidth'] * MB),
+            latency=options['latency'],
+            extract_latency=options['extract_latency'],
+            progressive_size=int(options['progressive_mb'] * MB),
+            video_size=int(options['video_mb'] * MB),
+            audio_size=int(options['audio_mb'] * MB),
+            segments=options['segments'],
+            proxies=proxies,
+            proxy_bandwidth=int(options['proxy_bandwidth'] * MB),
+        )
+        results = {}
+        proxy_stats = None
+        with environment:
+            for scenario in scenarios:
+                urls = make_urls(options['requests'], options['url_pool'], prefix=scenario)
+                samples, wall, peak_rss = run_requests(
+                    [(scenario, url) for url in urls], options['concurrency'], options['verbose'])
+                results[scenario] = dict(summarize(samples, wall), peak_rss=peak_rss)
+            if environment.proxy_pool:
+                proxy_stats = environment.proxy_pool.stats()
+                for stats, proxy in zip(proxy_stats, environment.proxies):
+                    stats.update(mode=proxy.mode, requests=proxy.requests)
+
+        if options['json']:
+            self.stdout.write(json.dumps(dict(results, proxies=proxy_stats) if proxy_stats else results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'scenario':<13}{'reqs':>6}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}"
+            f"{'MB/s':>9}{'peak RSS MB':>13}"
+        )
+        for scenario, r in results.items():
+            p50 = f"{r['p50'] * 1000:.0f}" if r['p50'] is not None else '-'
+            p99 = f"{r['p99'] * 1000:.0f}" if r['p99'] is not None else '-'
+            self.stdout.write(
+                f"{scenario:<13}{r['requests']:>6}{r['errors']:>8}{r['requests_per_sec']:>9.1f}"
+                f"{p50:>9}{p99:>9}{r['bytes_per_sec'] / MB:>9.1f}{r['peak_rss'] / MB:>13.0f}"
+            )
+            for error, count in r['top_errors']:
+                self.stdout.write(f"    {count} x {error[:110]}")
+
+        if proxy_stats:
+            self.stdout.write(
+                f"\n{'proxy':<28}{'mode':<11}{'requests':>9}{'ok':>6}{'failed':>8}{'banned':>8}"
+                f"{'KB/s':>9}  state"
+            )
+            for p in proxy_stats:
+                throughput = f"{p['throughput'] / 1024:.0f}" if p['throughput'] else '-'
+                state = 'available' if p['available'] else f"quarantined {p['quarantined_for']}s"
+                self.stdout.write(
+                    f"{p['proxy']:<28}{p['mode']:<11}{p['requests']:>9}{p['successes']:>6}{p['failures']:>8}"
+                    f"{p['bans']:>8}{throughput:>9}  {state}"
+                )
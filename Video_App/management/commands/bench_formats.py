@@ -0,0 +1,31 @@
+import timeit
+from django.core.management.base import BaseCommand, CommandError
+
+from Video_App.benchmarks.fixtures import load_fixtures, load_recorded
+from Video_App.formats import build_format_table
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark building the format table over fixture format lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--number', type=int, default=0, help='Calls per repeat (0 = auto)')
+
+    def handle(self, *args, **options):
+        fixtures = {}
+        for name, recorded in load_recorded().items():
+            if [r.to_dict() for r in build_format_table(recorded['formats'])] != recorded['table']:
+                raise CommandError(f"build_format_table output differs from the recorded table for {name}")
+            fixtures[name] = recorded['formats']
+        fixtures.update(load_fixtures())
+
+        self.stdout.write(f"{'fixture':<22}{'formats':>8}{'table µs':>12}{'+serialize µs':>15}")
+        for name, formats in fixtures.items():
+            number = options['number'] or max(1, 20000 // len(formats))
+            table_us = self._time(lambda: build_format_table(formats), number, options['repeat'])
+            serialize_us = self._time(lambda: [r.to_dict() for r in build_format_table(formats)], number, options['repeat'])
+            self.stdout.write(f"{name:<22}{len(formats):>8}{table_us:>12.1f}{serialize_us:>15.1f}")
+
+    def _time(self, func, number, repeat):
+        return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
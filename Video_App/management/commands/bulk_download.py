@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import shutil
+import threading
+from collections import OrderedDict, deque
+from django.core.management.base import BaseCommand, CommandError
+
+from Video_App.drain import drain_controller
+from Video_App.views import downloader_service
+
+MB = 1024 * 1024
+
+
+class Manifest:
+    """Append-only JSON-lines record of finished items, keyed by video and format"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get('status') == 'ok':
+                        self.done[tuple(entry['key'])] = entry
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a')
+
+    def completed(self, key):
+        """The manifest entry for key if its file is still on disk"""
+        entry = self.done.get(key)
+        if entry and entry.get('path') and os.path.exists(entry['path']):
+            return entry
+        return None
+
+    def record(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry) + '\n')
+            self._file.flush()
+            if entry.get('status') == 'ok':
+                self.done[tuple(entry['key'])] = entry
+
+    def close(self):
+        self._file.close()
+
+
+class TokenBucket:
+    """Bandwidth budget shared by all workers, refilled at `rate` bytes/s.
+
+    consume() may overdraw the bucket; the caller then sleeps until its
+    share is paid back, so the workers together average `rate` however
+    many of them are downloading.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+    def progress_hook(self):
+        """yt-dlp progress hook charging one download's bytes to the bucket"""
+        last = [0]
+
+        def hook(d):
+            downloaded = d.get('downloaded_bytes') or 0
+            # A smaller count means the next file of the item (e.g. its audio) started
+            delta = downloaded - last[0] if downloaded >= last[0] else downloaded
+            last[0] = 0 if d.get('status') == 'finished' else downloaded
+            if delta > 0:
+                self.consume(delta)
+        return hook
+
+
+class Command(BaseCommand):
+    help = 'Download a list of URLs concurrently, skipping items already in the manifest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="File with one URL per line, or '-' for stdin")
+        parser.add_argument('--output', help='Directory for finished files (default: DOWNLOAD_DIR/bulk)')
+        parser.add_argument('--manifest', help='JSON-lines manifest (default: OUTPUT/manifest.jsonl)')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent downloads')
+        parser.add_argument('--per-platform', type=int, default=0,
+                            help='Concurrent downloads per platform (0 = no separate limit)')
+        parser.add_argument('--platform-limit', action='append', default=[], metavar='PLATFORM=N',
+                            help='Override the limit for one platform, e.g. Youtube=1 (repeatable)')
+        parser.add_argument('--rate-limit', type=float, default=0,
+                            help='Total bandwidth cap in MB/s, shared by the workers (0 = unlimited)')
+        parser.add_argument('--quality', default='best', help="best, worst or a height such as 720p")
+        parser.add_argument('--format-id', help='Exact yt-dlp format id to request')
+        parser.add_argument('--audio', action='store_true', help='Download audio only (MP3)')
+
+    def handle(self, *args, **options):
+        urls = self._read_urls(options['source'])
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        platform_limits = {}
+        for item in options['platform_limit']:
+            name, _, limit = item.partition('=')
+            try:
+                platform_limits[name.strip().lower()] = int(limit)
+            except ValueError:
+                raise CommandError(f"Invalid --platform-limit '{item}', expected PLATFORM=N")
+
+        output = options['output'] or os.path.join(downloader_service.download_dir, 'bulk')
+        os.makedirs(output, exist_ok=True)
+        manifest = Manifest(options['manifest'] or os.path.join(output, 'manifest.jsonl'))
+
+        download_type = 'audio' if options['audio'] else 'video'
+        format_id, quality = options['format_id'], options['quality']
+        format_key = downloader_service.format_key(format_id, quality, download_type)
+        workers = options['workers']
+        # This process is the only user of the service: let every worker run
+        downloader_service.scheduler.max_workers = max(downloader_service.scheduler.max_workers, workers)
+        # Per-item lines replace yt-dlp's own console progress
+        extra_opts = {} if options['verbosity'] > 1 else {'quiet': True, 'noprogress': True}
+        # One bucket for all workers, so the cap holds whether one item or all of them are running
+        bucket = TokenBucket(options['rate_limit'] * MB) if options['rate_limit'] else None
+        if bucket:
+            # No single item may exceed the total either; this also marks the
+            # downloads as throttled, so they say nothing about proxy speed
+            extra_opts['ratelimit'] = int(bucket.rate)
+
+        stats = {'ok': 0, 'failed': 0, 'skipped': 0, 'invalid': 0, 'bytes': 0}
+        per_platform = {}
+        # One queue per platform, so a batch dominated by one platform cannot
+        # tie up every worker waiting on that platform's limit
+        work = OrderedDict()
+        seen = set()
+        for url in urls:
+            is_valid, message = downloader_service.validate_url(url)
+            if not is_valid:
+                stats['invalid'] += 1
+                self.stderr.write(f"invalid  {url}: {message}")
+                continue
+            platform, video_id = downloader_service.canonical_video_id(url)
+            key = (platform, video_id, download_type, format_key)
+            if key in seen:
+                continue
+            seen.add(key)
+            if manifest.completed(key):
+                stats['skipped'] += 1
+                continue
+            work.setdefault(key[0], deque()).append((url, key))
+
+        total = sum(len(items) for items in work.values())
+        self.stdout.write(
+            f"{total} to download, {stats['skipped']} already in the manifest, "
+            f"{stats['invalid']} invalid; {workers} workers"
+        )
+        lock = threading.Lock()
+        available = threading.Condition(lock)
+        running = {}
+        finished = [0]
+
+        def next_item():
+            """Pop an item whose platform is under its limit, rotating between platforms"""
+            with available:
+                while not drain_controller.draining:
+                    if not any(work.values()):
+                        return None
+                    for platform in list(work):
+                        items = work[platform]
+                        limit = platform_limits.get(platform.lower(), options['per_platform'])
+                        if items and (not limit or running.get(platform, 0) < limit):
+                            running[platform] = running.get(platform, 0) + 1
+                            work.move_to_end(platform)
+                            return items.popleft()
+                    # Everything left belongs to platforms at their limit
+                    available.wait(0.5)
+                return None
+
+        def run():
+            while True:
+                item = next_item()
+                if item is None:
+                    return
+                url, key = item
+                try:
+                    entry = self._download(url, key, format_id, quality, download_type, extra_opts, output, bucket)
+                finally:
+                    with available:
+                        running[key[0]] -= 1
+                        available.notify_all()
+                manifest.record(entry)
+                with lock:
+                    finished[0] += 1
+                    stats[entry['status']] += 1
+                    stats['bytes'] += entry.get('bytes') or 0
+                    platform_stats = per_platform.setdefault(key[0], {'ok': 0, 'failed': 0, 'bytes': 0})
+                    platform_stats[entry['status']] += 1
+                    platform_stats['bytes'] += entry.get('bytes') or 0
+                    progress = f"[{finished[0]:>{len(str(total))}}/{total}]"
+                if entry['status'] == 'ok':
+                    self.stdout.write(
+                        f"{progress} ok      {entry['bytes'] / MB:8.1f} MB {entry['seconds']:7.1f}s  {entry['title']}")
+                else:
+                    self.stderr.write(f"{progress} failed  {url}: {entry['error']}")
+
+        start = time.monotonic()
+        threads = [threading.Thread(target=run, name=f'bulk-{i}', daemon=True) for i in range(min(workers, total))]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stderr.write('Interrupted: stopping downloads; rerun the command to resume them')
+            drain_controller.interrupt()
+            for thread in threads:
+                thread.join()
+        finally:
+            manifest.close()
+        self._summary(stats, per_platform, time.monotonic() - start, sum(len(items) for items in work.values()))
+
+    def _read_urls(self, source):
+        if source == '-':
+            lines = sys.stdin.read().splitlines()
+        else:
+            try:
+                with open(source) as f:
+                    lines = f.read().splitlines()
+            except OSError as e:
+                raise CommandError(f"Cannot read {source}: {e}")
+        return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+    def _download(self, url, key, format_id, quality, download_type, extra_opts, output, bucket=None):
+        started = time.monotonic()
+        entry = {'url': url, 'key': list(key), 'status': 'failed'}
+        try:
+            success, result, title = downloader_service.download_video(
+                url, format_id=format_id, quality=quality, download_type=download_type, extra_opts=extra_opts,
+                progress_hook=bucket.progress_hook() if bucket else None)
+        except Exception as e:
+            success, result, title = False, f"An unexpected error occurred: {e}", None
+        entry['seconds'] = round(time.monotonic() - started, 2)
+
+        if not success:
+            entry['error'] = result
+            return entry
+        target_dir = os.path.join(output, key[0])
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, f"{key[1]}-{os.path.basename(result)}")
+        try:
+            shutil.move(result, target)
+        except OSError as e:
+            entry['error'] = f"Failed to store download: {e}"
+            return entry
+        finally:
+            downloader_service.release_download(result)
+        entry.update(status='ok', path=target, title=title, bytes=os.path.getsize(target))
+        return entry
+
+    def _summary(self, stats, per_platform, wall, remaining):
+        done = stats['ok'] + stats['failed']
+        self.stdout.write(
+            f"\n{stats['ok']} downloaded, {stats['failed']} failed, {stats['skipped']} skipped, "
+            f"{stats['invalid']} invalid" + (f", {remaining} not started" if remaining else '')
+        )
+        self.stdout.write(
+            f"{stats['bytes'] / MB:.1f} MB in {wall:.1f}s: {stats['bytes'] / MB / wall if wall else 0:.2f} MB/s, "
+            f"{done / wall * 60 if wall else 0:.1f} items/min"
+        )
+        for platform, s in sorted(per_platform.items()):
+            self.stdout.write(f"  {platform:<14}{s['ok']:>5} ok {s['failed']:>5} failed {s['bytes'] / MB:>10.1f} MB")
@@ -0,0 +1,148 @@
+import json
+import shutil
+import time
+from contextlib import ExitStack
+from django.core.management.base import BaseCommand, CommandError
+
+from Video_App.benchmarks.e2e import BenchEnvironment, RSSSampler, quiet_output
+from Video_App.benchmarks.loadtest import LiveServer, find_saturation, parse_mix, run_step, step_report
+
+MB = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = 'Step up concurrent users replaying a traffic mix against the app and the local fake media backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mix', default='info=60,progressive=30,audio=10',
+                            help='Scenario weights, e.g. info=60,progressive=25,dash=5,audio=10')
+        parser.add_argument('--steps', default='1,2,4,8,16,32', help='Concurrent users per step')
+        parser.add_argument('--duration', type=float, default=20, help='Seconds per step')
+        parser.add_argument('--target', help='Base URL of a running deployment to load instead of the embedded server, '
+                                             'e.g. https://staging.example.com')
+        parser.add_argument('--videos', help='File of video URLs (one per line) to request with --target; '
+                                             'the first --hot-videos are the hot set')
+        parser.add_argument('--server-threads', type=int, default=8, help='WSGI request threads, like a gunicorn worker pool')
+        parser.add_argument('--hot-ratio', type=float, default=0.5, help='Share of requests for the repeated hot videos')
+        parser.add_argument('--hot-videos', type=int, default=20)
+        parser.add_argument('--slow-ratio', type=float, default=0.1, help='Share of users that read downloads slowly')
+        parser.add_argument('--slow-rate', type=float, default=0.25, help='Slow user read rate, MB/s')
+        parser.add_argument('--slo', type=float, default=5.0, help='p99 latency objective, seconds')
+        parser.add_argument('--bandwidth', type=float, default=0, help='Media server MB/s per connection (0 = unlimited)')
+        parser.add_argument('--latency', type=float, default=0.0, help='Media server delay per response, seconds')
+        parser.add_argument('--extract-latency', type=float, default=0.2, help='Simulated platform API time per extraction')
+        parser.add_argument('--progressive-mb', type=float, default=4)
+        parser.add_argument('--video-mb', type=float, default=16)
+        parser.add_argument('--audio-mb', type=float, default=2)
+        parser.add_argument('--stop-at-saturation', action='store_true', help='Skip the remaining steps once saturated')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+        parser.add_argument('--verbose', action='store_true', help='Keep app and yt-dlp output')
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+            steps = [int(s) for s in options['steps'].split(',') if s.strip()]
+        except ValueError as e:
+            raise CommandError(str(e))
+        if not steps or min(steps) < 1:
+            raise CommandError('--steps must list positive user counts')
+        videos = self._load_videos(options) if options['target'] else None
+        if not options['target'] and not shutil.which('ffmpeg') and ({'dash', 'audio'} & set(mix)):
+            self.stderr.write('ffmpeg not found: dash and audio requests will fail and count as errors')
+
+        run_id = f"lt{int(time.time()) % 10 ** 6}"
+        reports = []
+        with ExitStack() as stack:
+            if options['target']:
+                base_url = options['target'].rstrip('/')
+                description = f"Targeting {base_url} with {len(videos)} video URL(s)"
+            else:
+                stack.enter_context(BenchEnvironment(
+                    bandwidth=int(options['bandwidth'] * MB),
+                    latency=options['latency'],
+                    extract_latency=options['extract_latency'],
+                    progressive_size=int(options['progressive_mb'] * MB),
+                    video_size=int(options['video_mb'] * MB),
+                    audio_size=int(options['audio_mb'] * MB),
+                ))
+                server = stack.enter_context(LiveServer(threads=options['server_threads']))
+                base_url = server.base_url
+                description = f"Serving on {base_url} with {options['server_threads']} threads"
+            if not options['json']:
+                self.stdout.write(f"{description}; mix {mix}")
+                self._header()
+            for users in steps:
+                with quiet_output(options['verbose']), RSSSampler() as rss:
+                    samples, wall = run_step(
+                        base_url, users, options['duration'], mix,
+                        hot_ratio=options['hot_ratio'], hot_videos=options['hot_videos'],
+                        slow_ratio=options['slow_ratio'], slow_rate=int(options['slow_rate'] * MB),
+                        seed=options['seed'], run_id=run_id, videos=videos,
+                    )
+                # A remote server's memory is not ours to sample
+                peak_rss = None if options['target'] else rss.peak
+                report = dict(step_report(users, samples, wall), peak_rss=peak_rss)
+                reports.append(report)
+                if not options['json']:
+                    self._row(report)
+                index, _ = find_saturation(reports, slo=options['slo'])
+                if options['stop_at_saturation'] and index is not None:
+                    break
+
+        index, reason = find_saturation(reports, slo=options['slo'])
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'mix': mix,
+                'steps': reports,
+                'saturation': {'users': reports[index]['users'], 'reason': reason} if index is not None else None,
+            }, indent=2))
+            return
+        self._summary(reports, index, reason)
+
+    def _load_videos(self, options):
+        if not options['videos']:
+            raise CommandError('--target needs --videos: the fake extractor only exists in the embedded server')
+        try:
+            with open(options['videos']) as f:
+                videos = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['videos']}: {e}")
+        if not videos:
+            raise CommandError(f"No video URLs in {options['videos']}")
+        return videos
+
+    def _header(self):
+        self.stdout.write(
+            f"{'users':>6}{'reqs':>7}{'req/s':>8}{'err %':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'ttfb p99':>10}{'MB/s':>8}{'RSS MB':>8}"
+        )
+
+    def _row(self, r):
+        def ms(value):
+            return f"{value * 1000:.0f}" if value is not None else '-'
+        rss = f"{r['peak_rss'] / MB:.0f}" if r['peak_rss'] is not None else '-'
+        self.stdout.write(
+            f"{r['users']:>6}{r['requests']:>7}{r['requests_per_sec']:>8.1f}{r['error_rate'] * 100:>7.1f}"
+            f"{ms(r['p50']):>9}{ms(r['p95']):>9}{ms(r['p99']):>9}{ms(r['ttfb_p99']):>10}"
+            f"{r['bytes_per_sec'] / MB:>8.1f}{rss:>8}"
+        )
+
+    def _summary(self, reports, index, reason):
+        best = max(reports, key=lambda r: r['requests_per_sec'])
+        self.stdout.write(f"\nPeak throughput {best['requests_per_sec']} req/s at {best['users']} users")
+        if index is None:
+            self.stdout.write(f"No saturation up to {reports[-1]['users']} users")
+            detail = reports[-1]
+        else:
+            self.stdout.write(f"Saturated at {reports[index]['users']} users: {reason}")
+            detail = reports[index]
+
+        self.stdout.write("Latency percentiles exclude slow clients; their p99 was "
+                          + (f"{detail['slow_client_p99']:.1f}s" if detail['slow_client_p99'] is not None else 'n/a'))
+        self.stdout.write(f"\nBy scenario at {detail['users']} users:")
+        for name, r in detail['by_scenario'].items():
+            p99 = f"{r['p99'] * 1000:.0f}" if r['p99'] is not None else '-'
+            self.stdout.write(f"  {name:<12}{r['requests']:>6} reqs  {r['error_rate'] * 100:5.1f}% errors  p99 {p99} ms")
+            for error, count in r['top_errors']:
+                self.stdout.write(f"      {count} x {error}")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from Video_App.drain import drain_controller
+from Video_App.scratch import ScratchSpace
+from Video_App.serving import evict_job_outputs, evict_served_files
+from Video_App.views import downloader_service
+
+
+class Command(BaseCommand):
+    help = 'Remove orphaned scratch directories, expired served files, job outputs and prefetches, and stale drain checkpoints (suitable for cron)'
+
+    def handle(self, *args, **options):
+        scratch = ScratchSpace()
+        reclaimed, freed = scratch.reclaim_orphans()
+        evicted = evict_served_files(force=True)
+        job_outputs = evict_job_outputs(downloader_service.download_dir, force=True)
+        prefetched = downloader_service.prefetcher.sweep()
+        expired = drain_controller.evict_checkpoints()
+        self.stdout.write(
+            f"Reclaimed {reclaimed} orphaned director{'y' if reclaimed == 1 else 'ies'} "
+            f"({round(freed / (1024 * 1024), 1)} MB) under {scratch.root}; "
+            f"{round(scratch.free_bytes() / (1024 * 1024 * 1024), 1)} GB free; "
+            f"evicted {evicted} served download(s), {job_outputs} job output(s), {prefetched} prefetched file(s) "
+            f"and {expired} stale drain checkpoint(s)"
+        )
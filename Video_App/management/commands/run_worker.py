@@ -0,0 +1,121 @@
+import os
+import time
+import shutil
+import socket
+import threading
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Video_App.backends import get_backend
+from Video_App.drain import drain_controller, install_drain_handler
+from Video_App.models import DownloadJob
+from Video_App.views import downloader_service
+
+
+class Command(BaseCommand):
+    help = 'Claim download jobs from the shared job backend and run them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--worker-id', default=f"{socket.gethostname()}:{os.getpid()}")
+        parser.add_argument('--once', action='store_true', help='Run at most one job and exit')
+        parser.add_argument('--poll-timeout', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        install_drain_handler()
+        backend = get_backend()
+        worker_id = options['worker_id']
+        stale_timeout = getattr(settings, 'JOB_STALE_TIMEOUT', 300)
+        self.stdout.write(f"Worker {worker_id} waiting for jobs")
+
+        while not drain_controller.draining:
+            requeued = backend.requeue_stale(stale_timeout)
+            if requeued:
+                self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+            claimed = backend.claim(worker_id, timeout=options['poll_timeout'])
+            if claimed is None:
+                if options['once']:
+                    return
+                continue
+
+            job_id, payload = claimed
+            # The drain waits for the job, including handing it back if interrupted
+            with drain_controller.track():
+                self.run_job(backend, worker_id, job_id, payload)
+            if options['once']:
+                return
+
+        self.stdout.write(f"Worker {worker_id} drained, exiting")
+
+    def run_job(self, backend, worker_id, job_id, payload):
+        self.stdout.write(f"Running job {job_id}: {payload.get('url')}")
+        interval = getattr(settings, 'JOB_HEARTBEAT_INTERVAL', 10)
+        progress = {'status': 'starting'}
+        last_report = [0.0]
+        done = threading.Event()
+
+        def progress_hook(d):
+            progress.update({
+                'status': d.get('status'),
+                'downloaded_bytes': d.get('downloaded_bytes'),
+                'total_bytes': d.get('total_bytes') or d.get('total_bytes_estimate'),
+                'speed': d.get('speed'),
+                'eta': d.get('eta'),
+            })
+            now = time.monotonic()
+            if now - last_report[0] >= 1:
+                last_report[0] = now
+                backend.heartbeat(job_id, dict(progress), worker_id=worker_id)
+
+        def keepalive():
+            # Merges and conversions emit no progress; keep the claim alive anyway
+            while not done.wait(interval):
+                if not backend.heartbeat(job_id, worker_id=worker_id):
+                    self.stderr.write(f"Job {job_id} was taken over by another worker")
+                    return
+
+        heartbeat_thread = threading.Thread(target=keepalive, daemon=True)
+        heartbeat_thread.start()
+        try:
+            success, result, title = downloader_service.download_video(
+                payload['url'],
+                format_id=payload.get('format_id'),
+                quality=payload.get('quality'),
+                download_type=payload.get('download_type', 'video'),
+                job_id=job_id,
+                progress_hook=progress_hook,
+            )
+        except Exception as e:
+            success, result, title = False, f"An unexpected error occurred: {e}", None
+        finally:
+            done.set()
+
+        if not success and drain_controller.aborting:
+            # Partial files are checkpointed; the next worker resumes from them
+            backend.requeue(job_id, worker_id=worker_id)
+            self.stdout.write(f"Job {job_id} interrupted by shutdown, requeued")
+            return
+        if not success:
+            if backend.fail(job_id, result, worker_id=worker_id):
+                self.stderr.write(f"Job {job_id} failed: {result}")
+            else:
+                self.stderr.write(f"Job {job_id} failed, but another worker owns it now; result dropped")
+            return
+
+        # Publish to the shared download directory so any node can serve it
+        output_dir = os.path.join(downloader_service.download_dir, job_id)
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, os.path.basename(result))
+        shutil.move(result, output_path)
+        downloader_service.release_download(result)
+        DownloadJob.objects.filter(job_id=job_id).update(output_path=output_path)
+
+        owned = backend.complete(job_id, {
+            'path': output_path,
+            'title': title,
+            'filesize': os.path.getsize(output_path),
+        }, worker_id=worker_id)
+        if owned:
+            self.stdout.write(f"Job {job_id} finished: {output_path}")
+        else:
+            self.stderr.write(f"Job {job_id} finished, but another worker owns it now; result dropped")
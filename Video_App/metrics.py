@@ -0,0 +1,223 @@
+"""Minimal Prometheus-style metrics for the download pipeline.
+
+Metrics live in process memory and are rendered in the Prometheus text
+exposition format by the /metrics view. Updating one is a dict update under
+a per-metric lock, cheap enough for the hot path. Under a multi-process
+server each worker process reports its own values; scrape every process
+or aggregate by instance.
+"""
+import math
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}' for labels, v in items]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._function = function
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set_function(self, function):
+        """Compute the value(s) at scrape time: a number, or {labels: value}"""
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                result = self._function()
+            except Exception:
+                return []
+            items = sorted(result.items()) if isinstance(result, dict) else [((), result)]
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [
+            f'{self.name}{_format_labels(self.labelnames, labels if isinstance(labels, tuple) else (labels,))} {_format_value(v)}'
+            for labels, v in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._values.items())
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+def postprocessor_timer():
+    """A yt-dlp postprocessor hook recording each postprocessor's run time"""
+    started = {}
+
+    def hook(d):
+        name = d.get('postprocessor')
+        if d.get('status') == 'started':
+            started[name] = time.perf_counter()
+        elif d.get('status') == 'finished' and name in started:
+            POSTPROCESS_SECONDS.observe(time.perf_counter() - started.pop(name), name)
+
+    return hook
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+
+    def render(self):
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+REGISTRY = Registry()
+
+BYTE_BUCKETS = tuple(2 ** n for n in range(16, 36, 2))  # 64 KB .. 16 GB
+
+EXTRACTION_SECONDS = Histogram(
+    'speedy_extraction_seconds', 'Time spent extracting video metadata', ['platform'])
+EXTRACTIONS = Counter(
+    'speedy_extractions_total', 'Metadata extractions by outcome (success, cached, failed)', ['platform', 'outcome'])
+DOWNLOAD_SECONDS = Histogram(
+    'speedy_download_seconds', 'Time spent downloading media, including merges', ['platform', 'lane'])
+POSTPROCESS_SECONDS = Histogram(
+    'speedy_postprocess_seconds', 'Time spent in yt-dlp postprocessors (merge, convert, extract audio)', ['postprocessor'])
+DOWNLOADS = Counter(
+    'speedy_downloads_total',
+    'Finished downloads by outcome (success, prefetched, timeout, cancelled, no_disk, failed)',
+    ['platform', 'outcome'])
+FORMAT_FALLBACKS = Counter(
+    'speedy_format_fallbacks_total', 'Format selectors abandoned after HTTP 403 / unavailable format', ['platform'])
+BYTES_SERVED = Counter(
+    'speedy_bytes_served_total', 'Bytes of finished downloads handed to clients', ['backend'])
+SERVED_FILE_BYTES = Histogram(
+    'speedy_served_file_bytes', 'Size of served downloads', ['backend'], buckets=BYTE_BUCKETS)
+TIME_TO_FIRST_BYTE = Histogram(
+    'speedy_time_to_first_byte_seconds', 'Time from request start to the first response byte', ['view'])
+LANE_WAIT_SECONDS = Histogram(
+    'speedy_lane_wait_seconds', 'Time downloads waited for a scheduler lane slot', ['lane'])
+ACTIVE_JOBS = Gauge(
+    'speedy_active_jobs', 'Downloads currently running in this process')
+QUEUE_DEPTH = Gauge(
+    'speedy_queue_depth', 'Jobs waiting (scheduler lanes in this process, shared job backend)', ['queue'])
+SCRATCH_USED_BYTES = Gauge(
+    'speedy_scratch_used_bytes', 'Bytes used under the scratch root')
+SCRATCH_FREE_BYTES = Gauge(
+    'speedy_scratch_free_bytes', 'Free bytes on the scratch filesystem')
+THUMBNAILS = Counter(
+    'speedy_thumbnails_total', 'Thumbnail proxy requests by result (hit, resized, original, error)', ['result'])
+PROXY_EVENTS = Counter(
+    'speedy_egress_proxy_events_total', 'Egress proxy results (success, failed, banned, quarantined)', ['proxy', 'event'])
+PREFETCH_EVENTS = Counter(
+    'speedy_prefetch_events_total',
+    'Speculative prefetch events (predictions, started, skipped_budget, completed, failed, cancelled, '
+    'hits, inflight_hits, misses)',
+    ['event'])
+PREFETCH_BYTES = Counter(
+    'speedy_prefetch_bytes_total', 'Bytes fetched by prefetches, and bytes of prefetches nobody claimed', ['kind'])
+PREFETCH_ENTRIES = Gauge(
+    'speedy_prefetch_entries', 'Prefetches in this process by state (in_flight, ready)', ['state'])
+ACTIVE_JOBS.set(0)
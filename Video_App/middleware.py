@@ -0,0 +1,182 @@
+import os
+import re
+import time
+import uuid
+import mimetypes
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+from .drain import drain_controller
+from .metrics import TIME_TO_FIRST_BYTE
+from .tracing import bind
+
+
+class MetricsMiddleware:
+    """Record time to first byte per view and bind a request id for spans.
+
+    Buffered responses and files are timed when the view returns; other
+    streaming responses (NDJSON, ZIP) when their first chunk is produced.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        with bind(request_id=request_id):
+            response = self.get_response(request)
+        response['X-Request-ID'] = request_id
+        match = getattr(request, 'resolver_match', None)
+        if match and match.url_name:
+            view = match.url_name
+        elif request.path.startswith(settings.STATIC_URL):
+            view = 'static'
+        else:
+            view = 'unmatched'
+
+        if response.streaming and not isinstance(response, FileResponse):
+            response.streaming_content = self._first_chunk_timer(response.streaming_content, start, view)
+        else:
+            TIME_TO_FIRST_BYTE.observe(time.perf_counter() - start, view)
+        return response
+
+    def _first_chunk_timer(self, content, start, view):
+        first = True
+        for chunk in content:
+            if first:
+                TIME_TO_FIRST_BYTE.observe(time.perf_counter() - start, view)
+                first = False
+            yield chunk
+
+
+class DrainMiddleware:
+    """Turn away new work with 503 while the node drains for a restart.
+
+    Probes, metrics and reads of existing jobs (status, progress, finished
+    files) keep working so clients can collect what is already running.
+    """
+
+    ALLOWED_VIEWS = {
+        'healthz_live', 'healthz_ready', 'metrics', 'job_status', 'job_file',
+        'download_progress', 'prefetch_stats', 'scheduler_stats', 'proxy_stats', 'thumbnail',
+    }
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not drain_controller.draining:
+            return None
+        if request.resolver_match.url_name in self.ALLOWED_VIEWS:
+            return None
+        if request.method in ('GET', 'HEAD') and request.resolver_match.url_name == 'index':
+            return None
+        response = JsonResponse({
+            'success': False,
+            'error': 'This server is restarting. Please try again in a few seconds.'
+        }, status=503)
+        response['Retry-After'] = '10'
+        response['Connection'] = 'close'
+        return response
+
+
+class StaticFilesMiddleware:
+    """Serve collected static files, preferring their precompressed variants.
+
+    Requests under STATIC_URL are answered from STATIC_ROOT with the .br or
+    .gz copy CompressedManifestStaticFilesStorage wrote, if the client
+    accepts it. Content-hashed names never change, so they are cached for
+    STATIC_MAX_AGE and marked immutable; plain names get a short max-age and
+    Last-Modified revalidation. Anything not in STATIC_ROOT falls through.
+    """
+
+    HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^/]+$')
+    ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = settings.STATIC_ROOT
+        self.max_age = getattr(settings, 'STATIC_MAX_AGE', 365 * 24 * 3600)
+        self.unhashed_max_age = getattr(settings, 'STATIC_UNHASHED_MAX_AGE', 60)
+        # Relative name -> (path, available encodings); only existing files
+        self._files = {}
+
+    def __call__(self, request):
+        if self.root and request.method in ('GET', 'HEAD') and request.path.startswith(self.prefix):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def _lookup(self, name):
+        found = self._files.get(name)
+        if found is None:
+            try:
+                path = safe_join(self.root, name)
+            except (SuspiciousFileOperation, ValueError):
+                return None
+            if not os.path.isfile(path):
+                return None
+            encodings = tuple(
+                (encoding, suffix) for encoding, suffix in self.ENCODINGS
+                if os.path.isfile(path + suffix)
+            )
+            found = self._files[name] = (path, encodings)
+        return found
+
+    def serve(self, request, name):
+        found = self._lookup(name)
+        if found is None:
+            return None
+        path, encodings = found
+
+        accepted = _accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        encoding, suffix = next(((e, s) for e, s in encodings if e in accepted), (None, ''))
+        try:
+            stat = os.stat(path + suffix)
+            file = open(path + suffix, 'rb')
+        except OSError:
+            # Replaced by a new collectstatic run
+            self._files.pop(name, None)
+            return None
+
+        hashed = bool(self.HASHED_NAME_RE.search(name))
+        if not hashed and not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+            file.close()
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(name)
+            response = FileResponse(file, content_type=content_type or 'application/octet-stream')
+            # FileResponse names the .gz/.br file; the browser must not see it
+            del response['Content-Disposition']
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if hashed:
+            response['Cache-Control'] = f'public, max-age={self.max_age}, immutable'
+        else:
+            response['Cache-Control'] = f'public, max-age={self.unhashed_max_age}'
+        if encodings:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+def _accepted_encodings(header):
+    """Content codings named in an Accept-Encoding header, minus those with q=0"""
+    accepted = set()
+    for part in header.lower().split(','):
+        coding, _, params = part.partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if coding.strip():
+            accepted.add(coding.strip())
+    return accepted
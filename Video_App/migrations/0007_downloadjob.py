@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:36
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Video_App', '0006_rename_file_file_image_file_video'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DownloadJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('state', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='queued', max_length=10)),
+                ('url', models.CharField(max_length=2048)),
+                ('platform', models.CharField(blank=True, max_length=50)),
+                ('video_id', models.CharField(blank=True, max_length=255)),
+                ('format', models.CharField(blank=True, max_length=255)),
+                ('download_type', models.CharField(default='video', max_length=10)),
+                ('title', models.CharField(blank=True, max_length=500)),
+                ('output_path', models.CharField(blank=True, max_length=1024)),
+                ('bytes_total', models.BigIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.DeleteModel(
+            name='File',
+        ),
+        migrations.AddIndex(
+            model_name='downloadjob',
+            index=models.Index(fields=['video_id', 'format'], name='downloadjob_video_format_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='downloadjob',
+            index=models.Index(fields=['state'], name='downloadjob_state_idx'),
+        ),
+    ]
@@ -1,5 +1,82 @@
+import uuid
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
- 
- 
\ No newline at end of file
+
+class DownloadJobQuerySet(models.QuerySet):
+
+    def active(self):
+        return self.filter(state__in=[DownloadJob.STATE_QUEUED, DownloadJob.STATE_RUNNING])
+
+
+class DownloadJob(models.Model):
+    """One request to fetch a video in a given format, and how it went"""
+
+    STATE_QUEUED = 'queued'
+    STATE_RUNNING = 'running'
+    STATE_SUCCEEDED = 'succeeded'
+    STATE_FAILED = 'failed'
+    STATE_CANCELLED = 'cancelled'
+    STATE_CHOICES = [
+        (STATE_QUEUED, 'Queued'),
+        (STATE_RUNNING, 'Running'),
+        (STATE_SUCCEEDED, 'Succeeded'),
+        (STATE_FAILED, 'Failed'),
+        (STATE_CANCELLED, 'Cancelled'),
+    ]
+
+    job_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=STATE_QUEUED)
+    url = models.CharField(max_length=2048)
+    platform = models.CharField(max_length=50, blank=True)
+    video_id = models.CharField(max_length=255, blank=True)
+    format = models.CharField(max_length=255, blank=True)
+    download_type = models.CharField(max_length=10, default='video')
+    title = models.CharField(max_length=500, blank=True)
+    output_path = models.CharField(max_length=1024, blank=True)
+    bytes_total = models.BigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = DownloadJobQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['video_id', 'format'], name='downloadjob_video_format_idx'),
+            models.Index(fields=['state'], name='downloadjob_state_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.platform}:{self.video_id} [{self.format}] {self.state}"
+
+    def mark_succeeded(self, output_path, title='', bytes_total=None):
+        self.state = self.STATE_SUCCEEDED
+        self.output_path = output_path
+        self.title = (title or '')[:500]
+        self.bytes_total = bytes_total
+        self.finished_at = timezone.now()
+        self.save(update_fields=['state', 'output_path', 'title', 'bytes_total', 'finished_at'])
+
+    def mark_failed(self, error, state=STATE_FAILED):
+        self.state = state
+        self.error = error or ''
+        self.finished_at = timezone.now()
+        self.save(update_fields=['state', 'error', 'finished_at'])
+
+    def as_status(self):
+        return {
+            'job_id': str(self.job_id),
+            'state': self.state,
+            'platform': self.platform,
+            'video_id': self.video_id,
+            'format': self.format,
+            'title': self.title,
+            'bytes_total': self.bytes_total,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
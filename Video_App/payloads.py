@@ -0,0 +1,130 @@
+import gzip
+import json
+import hashlib
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+
+class PayloadJSONEncoder(DjangoJSONEncoder):
+    """JSON encoder that serializes FormatRecords (anything with to_dict)"""
+
+    def default(self, o):
+        if hasattr(o, 'to_dict'):
+            return o.to_dict()
+        return super().default(o)
+
+
+def serialize_video_info(video_info):
+    """Plain-dict copy of video_info with its FormatRecords serialized"""
+    formats = video_info.get('formats')
+    if not formats:
+        return video_info
+    return {**video_info, 'formats': [f.to_dict() if hasattr(f, 'to_dict') else f for f in formats]}
+
+
+def parse_fields(value):
+    """Parse a field projection like 'title,thumbnail,formats.quality'"""
+    if not value:
+        return None
+    if isinstance(value, (list, tuple)):
+        value = ','.join(value)
+    fields = tuple(sorted({f.strip() for f in value.split(',') if f.strip()}))
+    return fields or None
+
+
+def project_info(video_info, fields):
+    """Return only the requested fields of a video_info dict.
+
+    Top-level names select keys of video_info; 'formats.<name>' selects keys
+    of every format (asking for 'formats' alone keeps them whole).
+    """
+    if not fields:
+        return video_info
+
+    top_level = set()
+    format_fields = set()
+    for field in fields:
+        if field.startswith('formats.'):
+            format_fields.add(field[len('formats.'):])
+            top_level.add('formats')
+        else:
+            top_level.add(field)
+
+    projected = {key: video_info[key] for key in top_level if key in video_info}
+    if format_fields and 'formats' not in fields and projected.get('formats'):
+        projected['formats'] = [
+            fmt.to_dict(format_fields) if hasattr(fmt, 'to_dict')
+            else {key: fmt[key] for key in format_fields if key in fmt}
+            for fmt in projected['formats']
+        ]
+    return projected
+
+
+def info_etag(video_info):
+    """Stable fingerprint of a video_info dict, independent of key order"""
+    encoded = json.dumps(video_info, sort_keys=True, cls=PayloadJSONEncoder, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+
+def response_etag(base_etag, fields=None):
+    """ETag for one projection of a cached info payload"""
+    if fields:
+        base_etag = hashlib.sha1(f"{base_etag}:{','.join(fields)}".encode()).hexdigest()
+    # Weak: the same entity may be sent with different content encodings
+    return f'W/"{base_etag}"'
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header or not etag:
+        return False
+    if header.strip() == '*':
+        return True
+    wanted = etag[2:] if etag.startswith('W/') else etag
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def not_modified(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def compressed_json_response(request, payload, etag=None, status=200):
+    """Serialize payload to JSON, compressing it with br or gzip when accepted"""
+    content = json.dumps(payload, cls=PayloadJSONEncoder, separators=(',', ':')).encode()
+    accepted = request.headers.get('Accept-Encoding', '').lower()
+
+    encoding = None
+    if len(content) >= MIN_COMPRESS_SIZE:
+        if brotli is not None and 'br' in accepted:
+            content = brotli.compress(content, quality=5)
+            encoding = 'br'
+        elif 'gzip' in accepted:
+            content = gzip.compress(content, compresslevel=6)
+            encoding = 'gzip'
+
+    response = HttpResponse(content, content_type='application/json', status=status)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if etag:
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,310 @@
+import os
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection
+from yt_dlp.utils import DownloadCancelled
+
+from .metrics import PREFETCH_BYTES, PREFETCH_EVENTS
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """A prefetch for one (video, format) key, in flight or ready"""
+
+    __slots__ = ('key', 'video', 'estimated_size', 'cancel', 'done', 'path', 'title', 'size', 'finished_at')
+
+    def __init__(self, key, video, estimated_size):
+        self.key = key
+        self.video = video
+        self.estimated_size = estimated_size or 0
+        self.cancel = threading.Event()
+        self.done = threading.Event()
+        self.path = None
+        self.title = None
+        self.size = 0
+        self.finished_at = None
+
+
+class Prefetcher:
+    """Speculatively download the format a user is most likely to pick.
+
+    After metadata extraction the top combined (no-merge) format is fetched
+    into PREFETCH_DIR under a per-node concurrency, bandwidth and disk
+    budget. Prefetches run in their own PREFETCH_MAX_CONCURRENT threads,
+    outside the scheduler lanes, so they never hold a slot a user download
+    is waiting for. A download request that resolves to the same video and
+    format (a quality like 'best' or '720p' is resolved against the cached
+    format table) takes the prefetched file, or waits for the in-flight
+    prefetch; a request for a different format cancels it. A request waits at most
+    PREFETCH_CLAIM_TIMEOUT seconds for an in-flight prefetch, which runs
+    throttled, before cancelling it and downloading normally. Counters in
+    stats() give the hit rate.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.enabled = getattr(settings, 'PREFETCH_ENABLED', False)
+        self.prefetch_dir = getattr(settings, 'PREFETCH_DIR', os.path.join(settings.MEDIA_ROOT, 'prefetch'))
+        self.max_concurrent = getattr(settings, 'PREFETCH_MAX_CONCURRENT', 2)
+        self.bandwidth = getattr(settings, 'PREFETCH_BANDWIDTH', 10 * 1024 * 1024)
+        self.disk_budget = getattr(settings, 'PREFETCH_DISK_BUDGET', 5 * 1024 * 1024 * 1024)
+        self.max_filesize = getattr(settings, 'PREFETCH_MAX_FILESIZE', 500 * 1024 * 1024)
+        self.ttl = getattr(settings, 'PREFETCH_TTL', 600)
+        self.claim_timeout = getattr(settings, 'PREFETCH_CLAIM_TIMEOUT', 15)
+
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._last_sweep = 0
+        self._stats = {
+            'predictions': 0,
+            'started': 0,
+            'skipped_budget': 0,
+            'completed': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'hits': 0,
+            'inflight_hits': 0,
+            'misses': 0,
+            'bytes_prefetched': 0,
+            'bytes_wasted': 0,
+        }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._count_locked(name, amount)
+
+    def _count_locked(self, name, amount=1):
+        self._stats[name] += amount
+        if name.startswith('bytes_'):
+            PREFETCH_BYTES.inc(name[len('bytes_'):], amount=amount)
+        else:
+            PREFETCH_EVENTS.inc(name, amount=amount)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = sum(1 for e in self._entries.values() if not e.done.is_set())
+            stats['ready'] = sum(1 for e in self._entries.values() if e.path)
+        lookups = stats['hits'] + stats['inflight_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['inflight_hits']) / lookups, 3) if lookups else None
+        return stats
+
+    def predict(self, video_info):
+        """The option most users pick: the best ready-to-download format"""
+        formats = video_info.get('formats') or []
+        for fmt in formats:
+            if not fmt.will_merge and fmt.has_audio and fmt.height:
+                return fmt
+        return formats[0] if formats else None
+
+    def _key(self, url, format_id, quality, download_type):
+        video = self.service.canonical_video_id(url)
+        return video + (self.service.format_key(format_id, quality, download_type),), video
+
+    def _resolve_format_id(self, url, quality):
+        """The table option a request without a format_id would download, if the info is cached.
+
+        Mirrors the selectors download_video builds: the highest option
+        (capped at the height of a '720p' style quality), or the lowest for
+        'worst'.
+        """
+        video_info = self.service.get_cached_info(url)
+        options = [f for f in (video_info or {}).get('formats') or [] if f.height]
+        quality = quality or 'best'
+        if quality.endswith('p'):
+            try:
+                limit = int(quality.split('p')[0].split(' ')[0])
+            except ValueError:
+                return None
+            options = [f for f in options if f.height <= limit]
+        elif quality not in ('best', 'worst'):
+            return None
+        if not options:
+            return None
+        pick = min if quality == 'worst' else max
+        return pick(options, key=lambda f: (f.height, f.fps or 0)).format_id
+
+    def maybe_prefetch(self, url, video_info):
+        """Start prefetching the predicted format if the budgets allow it"""
+        if not self.enabled:
+            return
+        fmt = self.predict(video_info)
+        if fmt is None:
+            return
+        self._count('predictions')
+        key, video = self._key(url, fmt.format_id, fmt.quality, 'video')
+
+        self.maybe_sweep()
+        with self._lock:
+            self._evict_locked()
+            if key in self._entries:
+                return
+            in_flight = sum(1 for e in self._entries.values() if not e.done.is_set())
+            reserved = sum(e.size or e.estimated_size for e in self._entries.values())
+            if (in_flight >= self.max_concurrent
+                    or not fmt.filesize or fmt.filesize > self.max_filesize
+                    or reserved + fmt.filesize > self.disk_budget):
+                self._count_locked('skipped_budget')
+                return
+            entry = _Entry(key, video, fmt.filesize)
+            self._entries[key] = entry
+            self._count_locked('started')
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='prefetch')
+
+        logger.info(f"Prefetching {video} format {fmt.format_id} ({fmt.filesize} bytes)")
+        self._executor.submit(self._run, entry, url, fmt.format_id, fmt.quality)
+
+    def _run(self, entry, url, format_id, quality):
+        def cancel_hook(d):
+            if entry.cancel.is_set():
+                raise DownloadCancelled('Prefetch cancelled')
+
+        try:
+            success, result, title = self.service._download_video(
+                url, format_id, quality, 'video',
+                progress_hook=cancel_hook,
+                extra_opts={'ratelimit': max(1, self.bandwidth // max(1, self.max_concurrent))},
+                lane='prefetch',
+            )
+            if success and entry.cancel.is_set():
+                self.service.release_download(result)
+                success = False
+            if not success:
+                self._count('cancelled' if entry.cancel.is_set() else 'failed')
+                with self._lock:
+                    self._entries.pop(entry.key, None)
+                return
+
+            target_dir = os.path.join(self.prefetch_dir, hashlib.sha1('\0'.join(entry.key).encode()).hexdigest())
+            os.makedirs(target_dir, exist_ok=True)
+            target = os.path.join(target_dir, os.path.basename(result))
+            shutil.move(result, target)
+            self.service.release_download(result)
+
+            entry.path, entry.title = target, title
+            entry.size = os.path.getsize(target)
+            entry.finished_at = time.time()
+            self._count('completed')
+            self._count('bytes_prefetched', entry.size)
+        except Exception as e:
+            logger.warning(f"Prefetch failed for {url}: {e}")
+            self._count('failed')
+            with self._lock:
+                self._entries.pop(entry.key, None)
+        finally:
+            entry.done.set()
+            connection.close()
+
+    def claim(self, url, format_id, quality, download_type):
+        """Take a prefetched file for this request, moving it into scratch.
+
+        Returns (path, title) on a hit, or None. Prefetches of the same
+        video in another format are cancelled, since the user chose
+        something else.
+        """
+        if not self.enabled:
+            return None
+        video = self.service.canonical_video_id(url)
+        with self._lock:
+            pending = any(e.video == video for e in self._entries.values())
+        if not pending:
+            self._count('misses')
+            return None
+
+        if download_type != 'audio' and not format_id:
+            format_id = self._resolve_format_id(url, quality)
+        key, video = self._key(url, format_id, quality, download_type)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            for other in list(self._entries.values()):
+                if other.video == video and other.key != key:
+                    self._discard_locked(other)
+
+        if entry is None:
+            self._count('misses')
+            return None
+
+        in_flight = not entry.done.is_set()
+        if not entry.done.wait(self.claim_timeout):
+            # Still far off at the prefetch bandwidth: a normal download is faster
+            logger.info(f"Prefetch of {video} not ready within {self.claim_timeout}s, downloading directly")
+            with self._lock:
+                self._discard_locked(entry)
+                self._count_locked('misses')
+            return None
+        with self._lock:
+            if self._entries.get(key) is not entry or not entry.path:
+                self._count_locked('misses')
+                return None
+            del self._entries[key]
+            self._count_locked('inflight_hits' if in_flight else 'hits')
+
+        job_dir = self.service.scratch.lease()
+        path = os.path.join(job_dir, os.path.basename(entry.path))
+        try:
+            shutil.move(entry.path, path)
+        except OSError as e:
+            # Swept by another process after PREFETCH_TTL
+            logger.warning(f"Prefetched file for {video} is gone: {e}")
+            self.service.scratch.release(job_dir)
+            return None
+        finally:
+            shutil.rmtree(os.path.dirname(entry.path), ignore_errors=True)
+        logger.info(f"Prefetch hit for {video} ({entry.size} bytes)")
+        return path, entry.title
+
+    def _discard_locked(self, entry):
+        if not entry.done.is_set():
+            entry.cancel.set()
+            return
+        self._entries.pop(entry.key, None)
+        if entry.path:
+            self._count_locked('bytes_wasted', entry.size)
+            shutil.rmtree(os.path.dirname(entry.path), ignore_errors=True)
+
+    def _evict_locked(self):
+        now = time.time()
+        for entry in list(self._entries.values()):
+            if entry.path and now - entry.finished_at > self.ttl:
+                self._discard_locked(entry)
+
+    def maybe_sweep(self):
+        """Run sweep() if it has not run within PREFETCH_TTL"""
+        if time.time() - self._last_sweep >= self.ttl:
+            self.sweep()
+
+    def sweep(self):
+        """Remove prefetched files no entry here owns once they are older than PREFETCH_TTL.
+
+        Entries live in this process only, so files left by a restart or by
+        other worker processes are found on disk instead.
+        """
+        now = time.time()
+        self._last_sweep = now
+        try:
+            names = os.listdir(self.prefetch_dir)
+        except OSError:
+            return 0
+        with self._lock:
+            owned = {os.path.dirname(e.path) for e in self._entries.values() if e.path}
+        swept = 0
+        for name in names:
+            path = os.path.join(self.prefetch_dir, name)
+            try:
+                if path not in owned and now - os.path.getmtime(path) > self.ttl:
+                    shutil.rmtree(path, ignore_errors=True)
+                    swept += 1
+            except OSError:
+                pass
+        if swept:
+            logger.info(f"Swept {swept} stale prefetched download(s) from {self.prefetch_dir}")
+        return swept
@@ -0,0 +1,232 @@
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from django.conf import settings
+from .metrics import PROXY_EVENTS
+
+logger = logging.getLogger(__name__)
+
+# Pool entry meaning "no proxy": yt-dlp connects from this node's own address
+DIRECT = 'direct'
+
+# Error text that says the platform has blocked the address we came from
+BAN_MARKERS = ('http error 429', 'too many requests', 'sign in to confirm', 'not a bot')
+# Error text pointing at the route rather than the video. HTTP 403 is left
+# out: platforms answer it for restricted formats and expired signatures.
+FAILURE_MARKERS = (
+    'unable to connect to proxy', 'proxyerror', 'tunnel connection failed',
+    'timed out', 'connection refused', 'connection reset', 'remote end closed',
+)
+
+
+def classify_error(message):
+    """'banned', 'failed' or None (the error says nothing about the proxy)"""
+    message = (message or '').lower()
+    if any(marker in message for marker in BAN_MARKERS):
+        return 'banned'
+    if any(marker in message for marker in FAILURE_MARKERS):
+        return 'failed'
+    return None
+
+
+class _Proxy:
+    """Recent results of one egress route"""
+
+    __slots__ = ('url', 'name', 'health', 'throughput', 'samples', 'consecutive_failures', 'strikes',
+                 'quarantined_until', 'in_flight', 'successes', 'failures', 'bans')
+
+    def __init__(self, url):
+        self.url = url
+        parsed = urlparse(url)
+        # Credentials stay out of logs and metric labels
+        self.name = DIRECT if url == DIRECT else f"{parsed.scheme}://{parsed.netloc.rpartition('@')[2]}"
+        self.health = 1.0
+        self.throughput = None
+        self.samples = 0
+        self.consecutive_failures = 0
+        self.strikes = 0
+        self.quarantined_until = 0.0
+        self.in_flight = 0
+        self.successes = 0
+        self.failures = 0
+        self.bans = 0
+
+    @property
+    def ydl_proxy(self):
+        return '' if self.url == DIRECT else self.url
+
+
+class ProxyPool:
+    """Spread yt-dlp traffic over EGRESS_PROXIES, steering away from bad routes.
+
+    Every proxy keeps an exponentially weighted success rate and download
+    throughput. A video sticks to the proxy it first used for
+    EGRESS_PROXY_STICKY_TTL seconds, so its extraction, signed media URLs
+    and download all come from one address. New videos go to a proxy picked
+    at random, weighted by health x throughput / (1 + running jobs).
+
+    A proxy is quarantined after a ban (HTTP 429, bot check),
+    EGRESS_PROXY_MAX_FAILURES consecutive failures, or when its throughput
+    stays under EGRESS_PROXY_MIN_THROUGHPUT. Quarantine lasts
+    EGRESS_PROXY_QUARANTINE seconds, doubling with each repeat. Scores live
+    in this process only. With no proxies configured the pool is disabled
+    and yt-dlp connects directly.
+    """
+
+    def __init__(self, proxies=None):
+        if proxies is None:
+            proxies = getattr(settings, 'EGRESS_PROXIES', [])
+        self.sticky_ttl = getattr(settings, 'EGRESS_PROXY_STICKY_TTL', 3600)
+        self.alpha = getattr(settings, 'EGRESS_PROXY_EWMA_ALPHA', 0.3)
+        self.max_failures = getattr(settings, 'EGRESS_PROXY_MAX_FAILURES', 3)
+        self.min_throughput = getattr(settings, 'EGRESS_PROXY_MIN_THROUGHPUT', 256 * 1024)
+        self.min_samples = getattr(settings, 'EGRESS_PROXY_MIN_SAMPLES', 3)
+        self.quarantine = getattr(settings, 'EGRESS_PROXY_QUARANTINE', 300)
+        self.max_quarantine = getattr(settings, 'EGRESS_PROXY_MAX_QUARANTINE', 3600)
+        self.max_switches = getattr(settings, 'EGRESS_PROXY_MAX_SWITCHES', 2)
+
+        self._proxies = [_Proxy(url) for url in dict.fromkeys(proxies)]
+        self._sticky = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self._proxies)
+
+    def _available_locked(self, now):
+        return [p for p in self._proxies if p.quarantined_until <= now]
+
+    def _score(self, proxy, typical):
+        return max(proxy.health, 0.05) * (proxy.throughput or typical) / (1 + proxy.in_flight)
+
+    def choose(self, key, exclude=()):
+        """The proxy for a video key, reusing its sticky proxy while that is healthy.
+
+        Returns a _Proxy, or None when the pool is disabled. `exclude` names
+        proxies that just failed this video.
+        """
+        if not self._proxies:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            sticky = self._sticky.get(key)
+            if sticky and sticky[1] > now and sticky[0].quarantined_until <= now \
+                    and sticky[0].name not in exclude:
+                proxy = sticky[0]
+            else:
+                candidates = [p for p in self._available_locked(now) if p.name not in exclude]
+                if not candidates:
+                    # Everything is quarantined or excluded: use the route that recovers first
+                    candidates = [min(self._proxies, key=lambda p: p.quarantined_until)]
+                known = sorted(p.throughput for p in self._proxies if p.throughput)
+                typical = known[len(known) // 2] if known else 1.0
+                proxy = random.choices(candidates, [self._score(p, typical) for p in candidates])[0]
+                self._prune_sticky_locked(now)
+            self._sticky[key] = (proxy, now + self.sticky_ttl)
+            return proxy
+
+    def _prune_sticky_locked(self, now):
+        if len(self._sticky) > 10000:
+            for key in [k for k, (_, expires) in self._sticky.items() if expires <= now]:
+                del self._sticky[key]
+
+    @contextmanager
+    def using(self, proxy):
+        """Count a transfer through proxy as running for the load-aware score"""
+        if proxy is None:
+            yield
+            return
+        with self._lock:
+            proxy.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                proxy.in_flight -= 1
+
+    def report(self, proxy, outcome, nbytes=0, seconds=0.0):
+        """Record 'success', 'failed' or 'banned' for a request through proxy.
+
+        Successful downloads pass their transfer size and time, which feed
+        the throughput average.
+        """
+        if proxy is None:
+            return
+        PROXY_EVENTS.inc(proxy.name, outcome)
+        with self._lock:
+            if outcome == 'success':
+                proxy.successes += 1
+                proxy.health += self.alpha * (1.0 - proxy.health)
+                proxy.consecutive_failures = 0
+                if nbytes and seconds > 0:
+                    rate = nbytes / seconds
+                    proxy.throughput = rate if proxy.throughput is None else \
+                        proxy.throughput + self.alpha * (rate - proxy.throughput)
+                    proxy.samples += 1
+                    if proxy.samples >= self.min_samples and proxy.throughput < self.min_throughput:
+                        self._quarantine_locked(proxy, f"throughput {proxy.throughput / 1024:.0f} KB/s")
+                        return
+                if proxy.strikes and time.monotonic() - proxy.quarantined_until > self.max_quarantine:
+                    # Well behaved for a long while: forgive earlier quarantines
+                    proxy.strikes = 0
+                return
+
+            proxy.health -= self.alpha * proxy.health
+            proxy.consecutive_failures += 1
+            if outcome == 'banned':
+                proxy.bans += 1
+                self._quarantine_locked(proxy, 'blocked by the platform')
+            else:
+                proxy.failures += 1
+                if proxy.consecutive_failures >= self.max_failures:
+                    self._quarantine_locked(proxy, f"{proxy.consecutive_failures} consecutive failures")
+
+    def report_error(self, proxy, message):
+        """Record a failed request from its error text; returns the outcome or None"""
+        outcome = classify_error(message)
+        if outcome:
+            self.report(proxy, outcome)
+        return outcome
+
+    def _quarantine_locked(self, proxy, reason):
+        if len(self._proxies) < 2 or proxy.quarantined_until > time.monotonic():
+            # Nowhere else to send traffic, or already out (a late result of a running job)
+            return
+        duration = min(self.quarantine * 2 ** proxy.strikes, self.max_quarantine)
+        proxy.quarantined_until = time.monotonic() + duration
+        proxy.strikes += 1
+        # Start over on probation when the quarantine ends
+        proxy.health = 0.5
+        proxy.consecutive_failures = 0
+        proxy.samples = 0
+        proxy.throughput = None
+        PROXY_EVENTS.inc(proxy.name, 'quarantined')
+        logger.warning(f"Egress proxy {proxy.name} quarantined for {duration}s: {reason}")
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                'proxy': p.name,
+                'available': p.quarantined_until <= now,
+                'quarantined_for': max(0, round(p.quarantined_until - now)),
+                'health': round(p.health, 3),
+                'throughput': round(p.throughput) if p.throughput else None,
+                'in_flight': p.in_flight,
+                'successes': p.successes,
+                'failures': p.failures,
+                'bans': p.bans,
+                'strikes': p.strikes,
+            } for p in self._proxies]
+
+
+def transfer_hook(result):
+    """yt-dlp progress hook adding each finished file's bytes and transfer time to result"""
+    def hook(d):
+        if d.get('status') == 'finished':
+            result['bytes'] = result.get('bytes', 0) + (d.get('total_bytes') or d.get('downloaded_bytes') or 0)
+            result['seconds'] = result.get('seconds', 0.0) + (d.get('elapsed') or 0.0)
+    return hook
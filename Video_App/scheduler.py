@@ -0,0 +1,155 @@
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from .metrics import LANE_WAIT_SECONDS
+from .tracing import emit_span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANES = {
+    # name: worker limit and base priority (lower runs first)
+    'small': {'workers': 4, 'priority': 0},
+    'standard': {'workers': 3, 'priority': 1},
+    'large': {'workers': 1, 'priority': 2},
+}
+# Lanes classify() assigns jobs to; DOWNLOAD_LANES must define all of them
+REQUIRED_LANES = ('small', 'standard', 'large')
+
+
+class _Waiter:
+    __slots__ = ('lane', 'priority', 'enqueued_at', 'granted')
+
+    def __init__(self, lane, priority):
+        self.lane = lane
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class LaneScheduler:
+    """Admit downloads through priority lanes with separate worker limits.
+
+    Each job is assigned to a lane from its estimated size, duration and
+    whether it is a high-resolution merge.
+    A job starts when both its lane and the node-wide DOWNLOAD_MAX_WORKERS
+    have a free slot; among waiting jobs the lowest priority number wins,
+    and every LANE_AGING_SECONDS of waiting lowers it by one so large jobs
+    cannot be starved by a steady stream of small ones.
+    """
+
+    def __init__(self):
+        self.lanes = getattr(settings, 'DOWNLOAD_LANES', DEFAULT_LANES)
+        self.max_workers = getattr(settings, 'DOWNLOAD_MAX_WORKERS', 6)
+        self.aging_seconds = getattr(settings, 'LANE_AGING_SECONDS', 30)
+        self.small_bytes = getattr(settings, 'LANE_SMALL_MAX_BYTES', 50 * 1024 * 1024)
+        self.small_seconds = getattr(settings, 'LANE_SMALL_MAX_DURATION', 5 * 60)
+        self.large_bytes = getattr(settings, 'LANE_LARGE_MIN_BYTES', 1024 * 1024 * 1024)
+        self.large_seconds = getattr(settings, 'LANE_LARGE_MIN_DURATION', 60 * 60)
+        self.large_merge_height = getattr(settings, 'LANE_LARGE_MERGE_MIN_HEIGHT', 2160)
+        self._validate_lanes()
+
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._running = {lane: 0 for lane in self.lanes}
+        self._waits = {lane: deque(maxlen=500) for lane in self.lanes}
+        self._admitted = {lane: 0 for lane in self.lanes}
+
+    def _validate_lanes(self):
+        missing = [lane for lane in REQUIRED_LANES if lane not in self.lanes]
+        if missing:
+            raise ImproperlyConfigured(f"DOWNLOAD_LANES is missing lane(s): {', '.join(missing)}")
+        for lane, config in self.lanes.items():
+            if not isinstance(config.get('workers'), int) or config['workers'] < 1 \
+                    or not isinstance(config.get('priority'), (int, float)):
+                raise ImproperlyConfigured(
+                    f"DOWNLOAD_LANES['{lane}'] needs an integer 'workers' >= 1 and a numeric 'priority'")
+
+    def classify(self, download_type='video', estimated_size=None, duration=None, will_merge=False, height=None):
+        """Pick a lane from what is known about the job before it starts"""
+        size = estimated_size or 0
+        duration = duration or 0
+        if size >= self.large_bytes or duration >= self.large_seconds:
+            return 'large'
+        if will_merge and height and height >= self.large_merge_height:
+            # 4K merges are heavy even when the platform does not report a size
+            return 'large'
+        if download_type == 'audio' or (
+                not will_merge and size and size <= self.small_bytes
+                and (not duration or duration <= self.small_seconds)):
+            return 'small'
+        return 'standard'
+
+    def _effective_priority(self, waiter, now):
+        return waiter.priority - (now - waiter.enqueued_at) / self.aging_seconds
+
+    def _dispatch_locked(self):
+        now = time.monotonic()
+        while sum(self._running.values()) < self.max_workers:
+            candidates = [
+                w for w in self._waiting
+                if self._running[w.lane] < self.lanes[w.lane]['workers']
+            ]
+            if not candidates:
+                return
+            chosen = min(candidates, key=lambda w: (self._effective_priority(w, now), w.enqueued_at))
+            self._waiting.remove(chosen)
+            chosen.granted = True
+            self._running[chosen.lane] += 1
+            self._admitted[chosen.lane] += 1
+            self._waits[chosen.lane].append(now - chosen.enqueued_at)
+        self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, lane):
+        """Block until the job may run in `lane`, holding the slot while inside"""
+        if lane not in self.lanes:
+            lane = 'standard'
+        waiter = _Waiter(lane, self.lanes[lane]['priority'])
+        with self._cond:
+            self._waiting.append(waiter)
+            self._dispatch_locked()
+            while not waiter.granted:
+                # Re-dispatch periodically so aging takes effect while blocked
+                self._cond.wait(timeout=self.aging_seconds / 2)
+                if not waiter.granted:
+                    self._dispatch_locked()
+        waited = time.monotonic() - waiter.enqueued_at
+        LANE_WAIT_SECONDS.observe(waited, lane)
+        emit_span('download.queue_wait', waited, lane=lane)
+        if waited > 1:
+            logger.info(f"Download waited {round(waited, 1)}s in lane {lane}")
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running[lane] -= 1
+                self._dispatch_locked()
+                self._cond.notify_all()
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._waiting)
+
+    def stats(self):
+        """Per-lane running/waiting counts and queue-wait percentiles"""
+        with self._cond:
+            waiting = {lane: 0 for lane in self.lanes}
+            for w in self._waiting:
+                waiting[w.lane] += 1
+            stats = {}
+            for lane, config in self.lanes.items():
+                waits = sorted(self._waits[lane])
+                stats[lane] = {
+                    'workers': config['workers'],
+                    'running': self._running[lane],
+                    'waiting': waiting[lane],
+                    'admitted': self._admitted[lane],
+                    'wait_p50': round(waits[len(waits) // 2], 3) if waits else None,
+                    'wait_p95': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None,
+                    'wait_max': round(waits[-1], 3) if waits else None,
+                }
+        return stats
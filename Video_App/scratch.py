@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import uuid
+import errno
+import shutil
+import socket
+import logging
+import tempfile
+import threading
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LEASE_FILE = '.lease'
+
+
+class ScratchSpace:
+    """Managed scratch directories for in-flight downloads.
+
+    Every job gets its own directory under one root together with a lease
+    file. A background thread refreshes the lease of every live job; a
+    janitor removes directories whose owner process is gone or whose lease
+    has not been refreshed within the timeout.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or getattr(settings, 'SCRATCH_ROOT', os.path.join(tempfile.gettempdir(), 'speedy_download'))
+        self.lease_timeout = getattr(settings, 'SCRATCH_LEASE_TIMEOUT', 120)
+        self.heartbeat_interval = getattr(settings, 'SCRATCH_HEARTBEAT_INTERVAL', 15)
+        self.janitor_interval = getattr(settings, 'SCRATCH_JANITOR_INTERVAL', 300)
+        self.min_free_bytes = getattr(settings, 'SCRATCH_MIN_FREE_BYTES', 1024 * 1024 * 1024)
+        self.size_factor = getattr(settings, 'SCRATCH_SIZE_FACTOR', 2.5)
+        self.hostname = socket.gethostname()
+
+        self._active = set()
+        self._lock = threading.Lock()
+        self._heartbeat_thread = None
+        self._last_sweep = 0
+
+        os.makedirs(self.root, exist_ok=True)
+
+    def lease(self, job_id=None):
+        """Create a job directory and start heartbeating its lease"""
+        self.maybe_reclaim()
+
+        job_dir = os.path.join(self.root, job_id or uuid.uuid4().hex)
+        os.makedirs(job_dir, exist_ok=True)
+        with open(os.path.join(job_dir, LEASE_FILE), 'w') as f:
+            json.dump({'pid': os.getpid(), 'host': self.hostname, 'created': time.time()}, f)
+
+        with self._lock:
+            self._active.add(job_dir)
+            self._ensure_heartbeat()
+        return job_dir
+
+    def release(self, job_dir):
+        """Stop heartbeating a job directory and remove it"""
+        with self._lock:
+            self._active.discard(job_dir)
+        shutil.rmtree(job_dir, ignore_errors=True)
+        logger.info(f"Released scratch directory: {job_dir}")
+
+    def heartbeat(self, job_dir):
+        """Refresh the lease of a single job directory"""
+        try:
+            os.utime(os.path.join(job_dir, LEASE_FILE))
+        except OSError:
+            pass
+
+    def _ensure_heartbeat(self):
+        if self._heartbeat_thread is None or not self._heartbeat_thread.is_alive():
+            self._heartbeat_thread = threading.Thread(
+                target=self._heartbeat_loop, name='scratch-heartbeat', daemon=True
+            )
+            self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(self.heartbeat_interval)
+            with self._lock:
+                active = list(self._active)
+            for job_dir in active:
+                self.heartbeat(job_dir)
+
+    def _is_orphaned(self, job_dir, now):
+        lease_path = os.path.join(job_dir, LEASE_FILE)
+        try:
+            mtime = os.path.getmtime(lease_path)
+        except OSError:
+            # No lease at all: only reclaim once the directory itself is stale
+            try:
+                mtime = os.path.getmtime(job_dir)
+            except OSError:
+                return False
+            return now - mtime > self.lease_timeout
+
+        try:
+            with open(lease_path) as f:
+                lease = json.load(f)
+        except (OSError, ValueError):
+            lease = {}
+
+        if lease.get('host') == self.hostname and lease.get('pid') and not _pid_alive(lease['pid']):
+            return True
+        return now - mtime > self.lease_timeout
+
+    def reclaim_orphans(self):
+        """Remove job directories whose owner died or stopped heartbeating"""
+        now = time.time()
+        self._last_sweep = now
+        reclaimed = 0
+        freed = 0
+
+        try:
+            entries = os.listdir(self.root)
+        except OSError as e:
+            logger.warning(f"Failed to scan scratch root {self.root}: {e}")
+            return 0, 0
+
+        with self._lock:
+            active = set(self._active)
+
+        for entry in entries:
+            job_dir = os.path.join(self.root, entry)
+            if job_dir in active or not os.path.isdir(job_dir):
+                continue
+            if self._is_orphaned(job_dir, now):
+                size = _dir_size(job_dir)
+                shutil.rmtree(job_dir, ignore_errors=True)
+                reclaimed += 1
+                freed += size
+                logger.info(f"Reclaimed orphaned scratch directory {job_dir} ({size} bytes)")
+
+        return reclaimed, freed
+
+    def maybe_reclaim(self):
+        """Run the janitor if it has not run within the janitor interval"""
+        if time.time() - self._last_sweep >= self.janitor_interval:
+            self.reclaim_orphans()
+
+    def free_bytes(self):
+        return shutil.disk_usage(self.root).free
+
+    def used_bytes(self):
+        return _dir_size(self.root)
+
+    def has_room_for(self, estimated_size):
+        """Check whether a job of the given estimated size fits on disk"""
+        free = self.free_bytes()
+        needed = int((estimated_size or 0) * self.size_factor) + self.min_free_bytes
+        return free >= needed, free, needed
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno == errno.EPERM
+    return True
+
+
+def _dir_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
@@ -0,0 +1,173 @@
+import os
+import io
+import time
+import uuid
+import shutil
+import logging
+from urllib.parse import quote
+from django.conf import settings
+from django.http import HttpResponse, FileResponse
+from .metrics import BYTES_SERVED, SERVED_FILE_BYTES
+from .tracing import current_context, emit_span, span
+
+logger = logging.getLogger(__name__)
+
+_last_eviction = 0
+_last_job_eviction = 0
+
+
+class _CleanupFile(io.FileIO):
+    """File object that runs a callback once the response has closed it"""
+
+    def __init__(self, path, on_close):
+        super().__init__(path, 'rb')
+        self._on_close = on_close
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            callback, self._on_close = self._on_close, None
+            if callback:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.warning(f"Post-serve cleanup failed: {e}")
+
+
+def serve_download(file_path, on_complete=None, keep=False):
+    """Build the response that delivers a finished download to the client.
+
+    With DOWNLOAD_SERVE_BACKEND = 'nginx' or 'apache' the file is moved into
+    DOWNLOAD_SERVE_ROOT and handed to the front-end proxy through an
+    X-Accel-Redirect or X-Sendfile header; the worker returns immediately and
+    the served copy is evicted after DOWNLOAD_SERVE_TTL seconds. Otherwise the
+    file is streamed by Django (wsgi.file_wrapper where the server offers it)
+    and on_complete runs once the response is closed. With keep=True the
+    file stays where it is (published as a link or copy), so it can be
+    served again.
+    """
+    backend = getattr(settings, 'DOWNLOAD_SERVE_BACKEND', 'python')
+    filename = os.path.basename(file_path)
+    size = os.path.getsize(file_path)
+    BYTES_SERVED.inc(backend, amount=size)
+    SERVED_FILE_BYTES.observe(size, backend)
+
+    if backend in ('nginx', 'apache'):
+        with span('serve.publish', backend=backend, bytes=size):
+            served_path = _publish(file_path, keep)
+        if on_complete:
+            on_complete()
+        evict_served_files()
+
+        response = HttpResponse(content_type='application/octet-stream')
+        if backend == 'nginx':
+            served_url = getattr(settings, 'DOWNLOAD_SERVE_URL', '/protected-downloads/')
+            relative = os.path.relpath(served_path, _serve_root())
+            response['X-Accel-Redirect'] = served_url.rstrip('/') + '/' + quote(relative.replace(os.sep, '/'))
+        else:
+            response['X-Sendfile'] = served_path
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    # Streaming ends after the view returned, so keep the ids for the span
+    context = current_context()
+    started = time.perf_counter()
+
+    def finished():
+        emit_span('serve.stream', time.perf_counter() - started, context=context, backend=backend, bytes=size)
+        if on_complete:
+            on_complete()
+
+    response = FileResponse(
+        _CleanupFile(file_path, finished),
+        content_type='application/octet-stream',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _serve_root():
+    return getattr(settings, 'DOWNLOAD_SERVE_ROOT', os.path.join(settings.MEDIA_ROOT, 'served'))
+
+
+def _publish(file_path, keep=False):
+    """Move (or with keep, link) a finished download into its own directory under the serve root"""
+    target_dir = os.path.join(_serve_root(), uuid.uuid4().hex)
+    os.makedirs(target_dir, exist_ok=True)
+    served_path = os.path.join(target_dir, os.path.basename(file_path))
+    if not keep:
+        shutil.move(file_path, served_path)
+        return served_path
+    try:
+        os.link(file_path, served_path)
+    except OSError:
+        # Different filesystem
+        shutil.copyfile(file_path, served_path)
+    return served_path
+
+
+def _is_job_id(name):
+    try:
+        uuid.UUID(name)
+        return True
+    except ValueError:
+        return False
+
+
+def _evict_older_than(root, ttl, now, match=None):
+    evicted = 0
+    for entry in os.listdir(root):
+        if match and not match(entry):
+            continue
+        path = os.path.join(root, entry)
+        try:
+            if now - os.path.getmtime(path) > ttl:
+                shutil.rmtree(path, ignore_errors=True)
+                evicted += 1
+        except OSError:
+            pass
+    return evicted
+
+
+def evict_served_files(force=False):
+    """Remove served downloads older than DOWNLOAD_SERVE_TTL"""
+    global _last_eviction
+
+    now = time.time()
+    ttl = getattr(settings, 'DOWNLOAD_SERVE_TTL', 3600)
+    if not force and now - _last_eviction < min(ttl, 60):
+        return 0
+    _last_eviction = now
+
+    root = _serve_root()
+    if not os.path.isdir(root):
+        return 0
+
+    evicted = _evict_older_than(root, ttl, now)
+    if evicted:
+        logger.info(f"Evicted {evicted} served download(s) from {root}")
+    return evicted
+
+
+def evict_job_outputs(root, force=False):
+    """Remove outputs of queued jobs finished more than JOB_OUTPUT_TTL seconds ago.
+
+    Job outputs are the <job_id> directories run_worker publishes under root
+    (DOWNLOAD_DIR); anything else there is left alone.
+    """
+    global _last_job_eviction
+
+    now = time.time()
+    ttl = getattr(settings, 'JOB_OUTPUT_TTL', 24 * 3600)
+    if not force and now - _last_job_eviction < min(ttl, 60):
+        return 0
+    _last_job_eviction = now
+
+    if not os.path.isdir(root):
+        return 0
+
+    evicted = _evict_older_than(root, ttl, now, match=_is_job_id)
+    if evicted:
+        logger.info(f"Evicted {evicted} job output(s) from {root}")
+    return evicted
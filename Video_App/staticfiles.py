@@ -0,0 +1,65 @@
+import os
+import gzip
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml')
+
+# Variants that do not save at least this fraction are not kept
+MIN_SAVING = 0.05
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Content-hashed static files with .gz and .br copies written beside them.
+
+    collectstatic names every file after its content hash (style.3f2a9c1b0d4e.css)
+    and then compresses the text assets once, at the highest levels, so
+    StaticFilesMiddleware (or nginx gzip_static / brotli_static) can send
+    them without compressing per request. Brotli copies need the optional
+    "brotli" package.
+    """
+
+    # Fall back to the plain name for files collectstatic has not seen yet
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        names = set()
+        for name in paths:
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                names.add(name)
+                hashed_name = self.hashed_files.get(self.hash_key(self.clean_name(name)))
+                if hashed_name:
+                    names.add(hashed_name)
+        for name in sorted(names):
+            for compressed_name in self._compress(name):
+                yield name, compressed_name, True
+
+    def _compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        variants = [
+            ('.gz', lambda: gzip.compress(data, compresslevel=9, mtime=0)),
+            ('.br', (lambda: brotli.compress(data, quality=11)) if brotli is not None else None),
+        ]
+
+        written = []
+        for suffix, compress in variants:
+            compressed = compress() if compress else None
+            if compressed is not None and len(compressed) <= len(data) * (1 - MIN_SAVING):
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+                written.append(name + suffix)
+            elif os.path.exists(path + suffix):
+                # A stale copy of an older version of the file
+                os.remove(path + suffix)
+        return written
@@ -0,0 +1,238 @@
+import io
+import os
+import hashlib
+import logging
+import threading
+import urllib.request
+from urllib.parse import urlparse
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+from .metrics import THUMBNAILS
+
+try:
+    from PIL import Image, features
+except ImportError:  # pragma: no cover - listed in requirements.txt
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+SIGNING_SALT = 'Video_App.thumbnails'
+
+# Upstream types served as they are when they cannot be resized. Anything
+# else (SVG in particular, which can carry script) is refused.
+SOURCE_TYPES = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/gif': 'gif',
+}
+CONTENT_TYPES = {ext: content_type for content_type, ext in SOURCE_TYPES.items()}
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+class ThumbnailError(Exception):
+    """The source thumbnail could not be fetched or is not an image"""
+
+
+def thumbnail_proxy_url(source):
+    """Signed thumbnail endpoint path for a platform thumbnail URL, or ''.
+
+    The signature means the endpoint only ever fetches URLs this server
+    handed out itself, so it cannot be used as an open proxy.
+    """
+    if not source or urlparse(source).scheme not in ('http', 'https'):
+        return ''
+    token = signing.Signer(salt=SIGNING_SALT).sign_object(source, compress=True)
+    return reverse('thumbnail', args=[token])
+
+
+def unsign_thumbnail(token):
+    """Source URL of a signed thumbnail token, or None if it was tampered with"""
+    try:
+        return signing.Signer(salt=SIGNING_SALT).unsign_object(token)
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+class ThumbnailCache:
+    """Fetch-once, size-bounded disk cache of thumbnails and their resized variants.
+
+    The original is fetched on first use and stored next to each resized
+    variant (WebP when the client accepts it and Pillow can write it, JPEG
+    otherwise). Least recently used files are evicted once the directory
+    grows past THUMBNAIL_CACHE_MAX_BYTES. Pillow is a requirement; if it is
+    missing anyway, resizing is off and the original is served as is.
+    """
+
+    def __init__(self):
+        self.cache_dir = getattr(settings, 'THUMBNAIL_CACHE_DIR', os.path.join(settings.MEDIA_ROOT, 'thumbnails'))
+        self.max_bytes = getattr(settings, 'THUMBNAIL_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+        self.max_source_bytes = getattr(settings, 'THUMBNAIL_MAX_SOURCE_BYTES', 5 * 1024 * 1024)
+        self.fetch_timeout = getattr(settings, 'THUMBNAIL_FETCH_TIMEOUT', 5)
+        self.widths = tuple(sorted(getattr(settings, 'THUMBNAIL_WIDTHS', (120, 240, 360, 480, 720))))
+        self.quality = getattr(settings, 'THUMBNAIL_QUALITY', 80)
+
+        self.can_resize = Image is not None
+        self.can_webp = self.can_resize and features.check('webp')
+
+        # Striped so concurrent requests for one thumbnail fetch it once
+        self._key_locks = [threading.Lock() for _ in range(64)]
+        self._size_lock = threading.Lock()
+        self._size = None
+
+    def snap_width(self, requested):
+        """The smallest configured width covering the requested one"""
+        try:
+            requested = int(requested)
+        except (TypeError, ValueError):
+            return self.widths[len(self.widths) // 2]
+        for width in self.widths:
+            if width >= requested:
+                return width
+        return self.widths[-1]
+
+    def get(self, source, width, webp=False):
+        """Returns (bytes, content type) of the thumbnail at the given width"""
+        key = hashlib.sha1(source.encode()).hexdigest()
+        ext = 'webp' if webp and self.can_webp else 'jpg'
+        variant = self._path(f'{key}-{width}.{ext}')
+
+        data = self._read(variant)
+        if data is not None:
+            THUMBNAILS.inc('hit')
+            return data, CONTENT_TYPES[ext]
+
+        with self._key_locks[int(key[:4], 16) % len(self._key_locks)]:
+            data = self._read(variant)
+            if data is not None:
+                THUMBNAILS.inc('hit')
+                return data, CONTENT_TYPES[ext]
+
+            original, original_ext = self._original(key, source)
+            if self.can_resize:
+                try:
+                    data = self._resize(original, width, ext)
+                except Exception as e:
+                    logger.info(f"Cannot resize thumbnail {source}: {e}")
+                else:
+                    self._write(variant, data)
+                    THUMBNAILS.inc('resized')
+                    return data, CONTENT_TYPES[ext]
+
+            THUMBNAILS.inc('original')
+            return original, CONTENT_TYPES[original_ext]
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            # Recency for the LRU eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _original(self, key, source):
+        for ext in CONTENT_TYPES:
+            data = self._read(self._path(f'{key}.{ext}'))
+            if data is not None:
+                return data, ext
+
+        data, ext = self._fetch(source)
+        self._write(self._path(f'{key}.{ext}'), data)
+        return data, ext
+
+    def _fetch(self, source):
+        request = urllib.request.Request(source, headers={'User-Agent': USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=self.fetch_timeout) as response:
+                content_type = response.headers.get_content_type()
+                data = response.read(self.max_source_bytes + 1)
+        except Exception as e:
+            THUMBNAILS.inc('error')
+            raise ThumbnailError(f"Failed to fetch thumbnail: {e}")
+        if content_type not in SOURCE_TYPES:
+            THUMBNAILS.inc('error')
+            raise ThumbnailError(f"Thumbnail has unsupported type {content_type}")
+        if len(data) > self.max_source_bytes:
+            THUMBNAILS.inc('error')
+            raise ThumbnailError('Thumbnail is too large')
+        return data, SOURCE_TYPES[content_type]
+
+    def _resize(self, data, width, ext):
+        image = Image.open(io.BytesIO(data))
+        # Lets the JPEG decoder scale down by 1/2..1/8 while decoding
+        image.draft('RGB', (width, width // 2))
+        image = image.convert('RGB')
+        image.thumbnail((width, width * 2), Image.LANCZOS, reducing_gap=2.0)
+        out = io.BytesIO()
+        if ext == 'webp':
+            image.save(out, 'WEBP', quality=self.quality, method=4)
+        else:
+            image.save(out, 'JPEG', quality=self.quality, optimize=True, progressive=True)
+        return out.getvalue()
+
+    def _write(self, path, data):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to cache thumbnail {path}: {e}")
+            return
+
+        with self._size_lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _disk_usage(self):
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            try:
+                total += entry.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _evict(self):
+        """Remove least recently used files until the cache is at 80% of its budget"""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.8
+        evicted = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                evicted += 1
+            except OSError:
+                pass
+        self._size = total
+        logger.info(f"Evicted {evicted} cached thumbnail file(s) from {self.cache_dir}")
+
+
+thumbnail_cache = ThumbnailCache()
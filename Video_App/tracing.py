@@ -0,0 +1,146 @@
+"""Per-phase timing spans and sampled profiling for requests and jobs.
+
+Each span is logged as one JSON line on the `Video_App.spans` logger,
+carrying the request/job identifiers bound in the current context:
+
+    {"span": "download.fetch", "duration_ms": 8123.4, "status": "ok",
+     "request_id": "...", "job_id": "...", "lane": "standard"}
+
+With PROFILE_SAMPLE_RATE > 0 that fraction of profiled operations also run
+under cProfile and leave a .prof file in PROFILE_DIR (open it with pstats
+or snakeviz).
+"""
+import os
+import json
+import time
+import random
+import logging
+import cProfile
+import threading
+import contextvars
+from contextlib import contextmanager
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+span_logger = logging.getLogger('Video_App.spans')
+
+_context = contextvars.ContextVar('trace_context', default={})
+
+# cProfile cannot profile two operations at once in one process
+_profile_lock = threading.Lock()
+
+
+def current_context():
+    """Identifiers (request_id, job_id, ...) bound to the current request or job"""
+    return _context.get()
+
+
+@contextmanager
+def bind(**fields):
+    """Attach identifiers to every span emitted inside the block"""
+    token = _context.set({**_context.get(), **{k: str(v) for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def propagate(fn):
+    """Wrap fn so it runs with the identifiers bound where propagate() was called"""
+    fields = current_context()
+
+    def wrapper(*args, **kwargs):
+        with bind(**fields):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def emit_span(name, duration, status='ok', context=None, **fields):
+    """Log one finished span; `context` overrides the current bound identifiers"""
+    if not getattr(settings, 'TRACE_SPANS', True):
+        return
+    record = {'span': name, 'duration_ms': round(duration * 1000, 1), 'status': status}
+    record.update(current_context() if context is None else context)
+    record.update(fields)
+    span_logger.info(json.dumps(record, default=str))
+
+
+@contextmanager
+def span(name, **fields):
+    """Time the block and log it as a span, marking it failed if it raises"""
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        yield fields
+    except BaseException as e:
+        status = 'error'
+        fields.setdefault('error', type(e).__name__)
+        raise
+    finally:
+        emit_span(name, time.perf_counter() - start, status, **fields)
+
+
+def download_span_hook():
+    """yt-dlp progress hook logging a span for each file (video, audio stream) fetched"""
+    started = {}
+
+    def hook(d):
+        filename = d.get('info_dict', {}).get('format_id') or os.path.basename(d.get('filename') or '')
+        if d.get('status') == 'downloading':
+            started.setdefault(filename, time.perf_counter())
+        elif d.get('status') in ('finished', 'error'):
+            start = started.pop(filename, None)
+            elapsed = d.get('elapsed') or (time.perf_counter() - start if start else 0)
+            emit_span(
+                'download.file', elapsed,
+                'ok' if d['status'] == 'finished' else 'error',
+                format_id=filename,
+                bytes=d.get('total_bytes') or d.get('downloaded_bytes'),
+                fragments=d.get('fragment_count'),
+            )
+
+    return hook
+
+
+def postprocessor_span_hook():
+    """yt-dlp postprocessor hook logging a span per postprocessor (Merger, FFmpegVideoConvertor, ...)"""
+    started = {}
+
+    def hook(d):
+        name = d.get('postprocessor')
+        if d.get('status') == 'started':
+            started[name] = time.perf_counter()
+        elif d.get('status') == 'finished' and name in started:
+            emit_span(f'postprocess.{name}', time.perf_counter() - started.pop(name))
+
+    return hook
+
+
+@contextmanager
+def maybe_profile(name):
+    """Run the block under cProfile for a PROFILE_SAMPLE_RATE fraction of calls"""
+    rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0)
+    if not rate or random.random() >= rate or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+        context = current_context()
+        ident = context.get('job_id') or context.get('request_id') or f'{int(time.time())}-{os.getpid()}'
+        profile_dir = getattr(settings, 'PROFILE_DIR', os.path.join(settings.MEDIA_ROOT, 'profiles'))
+        try:
+            os.makedirs(profile_dir, exist_ok=True)
+            path = os.path.join(profile_dir, f'{name}-{ident}.prof')
+            profiler.dump_stats(path)
+            logger.info(f"Wrote profile {path}")
+        except OSError as e:
+            logger.warning(f"Failed to write profile for {name}: {e}")
+    finally:
+        _profile_lock.release()
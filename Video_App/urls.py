@@ -7,4 +7,19 @@ urlpatterns = [
     path('facebook', views.facebook_downloader, name = 'facebook'),
     path('instagram', views.instagram_downloader, name = 'instagram'),
     path('twitter', views.twitter_downloader, name = 'twitter'), 
+    path('progress/<uuid:job_id>', views.download_progress, name = 'download_progress'),
+    path('jobs', views.enqueue_download, name = 'enqueue_download'),
+    path('jobs/<uuid:job_id>', views.job_status, name = 'job_status'),
+    path('jobs/<uuid:job_id>/file', views.job_file, name = 'job_file'),
+    path('batch', views.batch_download, name = 'batch_download'),
+    path('api/info', views.get_video_info_ajax, name = 'video_info'),
+    path('api/info/bulk', views.bulk_video_info, name = 'bulk_video_info'),
+    path('api/info/progressive', views.progressive_video_info, name = 'progressive_video_info'),
+    path('api/prefetch/stats', views.prefetch_stats, name = 'prefetch_stats'),
+    path('api/scheduler/stats', views.scheduler_stats, name = 'scheduler_stats'),
+    path('api/proxies/stats', views.proxy_stats, name = 'proxy_stats'),
+    path('thumb/<str:token>', views.thumbnail, name = 'thumbnail'),
+    path('metrics', views.metrics, name = 'metrics'),
+    path('healthz/live', views.healthz_live, name = 'healthz_live'),
+    path('healthz/ready', views.healthz_ready, name = 'healthz_ready'),
 ]
\ No newline at end of file
@@ -1,28 +1,120 @@
 import os
 import json
+import shutil
 import logging
-import tempfile
-import subprocess
-import signal
-from urllib.parse import urlparse
+import urllib.request
+from contextlib import nullcontext
+from urllib.parse import parse_qsl, quote, urlencode, urlparse, urlunparse
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse, Http404
+from django.urls import reverse
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
 from django.conf import settings
 import yt_dlp
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
+from functools import lru_cache
+from yt_dlp.extractor import gen_extractor_classes
+from yt_dlp.utils import DownloadCancelled
+from .backends import get_backend
+from .batch import stream_batch_zip
+from .drain import DrainCancelled, drain_controller
+from .formats import FormatRecord, build_format_table, get_quality_category
+from .metrics import (
+    ACTIVE_JOBS, DOWNLOAD_SECONDS, DOWNLOADS, EXTRACTION_SECONDS, EXTRACTIONS,
+    FORMAT_FALLBACKS, PREFETCH_ENTRIES, QUEUE_DEPTH, REGISTRY, SCRATCH_FREE_BYTES,
+    SCRATCH_USED_BYTES, postprocessor_timer,
+)
+from .models import DownloadJob
+from .prefetch import Prefetcher
+from .proxies import ProxyPool, classify_error, transfer_hook
+from .scheduler import LaneScheduler
+from .payloads import (
+    compressed_json_response, etag_matches, info_etag, not_modified,
+    parse_fields, project_info, response_etag, serialize_video_info,
+    PayloadJSONEncoder,
+)
+from .scratch import ScratchSpace
+from .serving import evict_job_outputs, serve_download
+from .thumbnails import ThumbnailError, thumbnail_cache, thumbnail_proxy_url, unsign_thumbnail
+from .tracing import bind, download_span_hook, maybe_profile, postprocessor_span_hook, propagate, span
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Query parameters that place a video inside a playlist
+PLAYLIST_PARAMS = ('list', 'index')
+
+
+def _match_extractor(url):
+    for ie in gen_extractor_classes():
+        if ie.ie_key() == 'Generic':
+            continue
+        try:
+            if ie.suitable(url):
+                return ie.ie_key(), str(ie.get_temp_id(url) or url)
+        except Exception:
+            continue
+    return 'Generic', url
+
+
+@lru_cache(maxsize=4096)
+def _canonical_video_id(url):
+    """Map a URL to (extractor key, video id) without touching the network.
+    
+    A video opened from a playlist (watch?v=A&list=PL...) maps to the video,
+    not the playlist; the playlist id is used only when no video is named.
+    """
+    parsed = urlparse(url)
+    query = parse_qsl(parsed.query, keep_blank_values=True)
+    if any(name in PLAYLIST_PARAMS for name, _ in query):
+        video_url = urlunparse(parsed._replace(
+            query=urlencode([(name, value) for name, value in query if name not in PLAYLIST_PARAMS])
+        ))
+        platform, video_id = _match_extractor(video_url)
+        if platform != 'Generic':
+            return platform, video_id
+    return _match_extractor(url)
+
+
+def _download_outcome(success, message):
+    """Bucket a download result for the downloads_total counter"""
+    if success:
+        return 'success'
+    message = (message or '').lower()
+    if 'timed out' in message:
+        return 'timeout'
+    if 'cancel' in message or 'interrupted' in message:
+        return 'cancelled'
+    if 'disk space' in message:
+        return 'no_disk'
+    return 'failed'
+
+
+# Fields the progressive info endpoint can return before formats are known
+BASIC_INFO_FIELDS = ('title', 'duration', 'uploader', 'thumbnail', 'thumbnail_proxy')
+
+OEMBED_ENDPOINTS = {
+    'Youtube': 'https://www.youtube.com/oembed',
+    'Vimeo': 'https://vimeo.com/api/oembed.json',
+    'Dailymotion': 'https://www.dailymotion.com/services/oembed',
+    'TikTok': 'https://www.tiktok.com/oembed',
+}
+
+
 class VideoDownloaderService:
     
     def __init__(self):
         self.download_dir = getattr(settings, 'DOWNLOAD_DIR', os.path.join(settings.MEDIA_ROOT, 'downloads'))
         self.ensure_download_dir()
+        self.scratch = ScratchSpace()
+        self.prefetcher = Prefetcher(self)
+        self.scheduler = LaneScheduler()
+        self.proxies = ProxyPool()
     
     def ensure_download_dir(self):
         """Ensure download directory exists"""
@@ -31,14 +123,21 @@ class VideoDownloaderService:
     
     def _cleanup_temp_dir(self, temp_dir):
         """Helper to clean up temporary directories."""
-        if os.path.exists(temp_dir):
-            try:
-                for f in os.listdir(temp_dir):
-                    os.remove(os.path.join(temp_dir, f))
-                os.rmdir(temp_dir)
-                logger.info(f"Cleaned up temporary directory: {temp_dir}")
-            except Exception as e:
-                logger.warning(f"Failed to clean up temp directory {temp_dir}: {e}")
+        self.scratch.release(temp_dir)
+    
+    def release_download(self, file_path):
+        """Release the scratch directory holding a served download"""
+        self._cleanup_temp_dir(os.path.dirname(file_path))
+    
+    def _estimate_filesize(self, info):
+        """Estimate the size of the selected format(s) from extracted info"""
+        requested = info.get('requested_formats') or [info]
+        total = 0
+        for fmt in requested:
+            size = fmt.get('filesize') or fmt.get('filesize_approx')
+            if size:
+                total += size
+        return total or None
     
     def validate_url(self, url):
         """Validate if URL is from supported platforms"""
@@ -49,7 +148,7 @@ class VideoDownloaderService:
             'youtube.com', 'youtu.be', 'facebook.com', 'fb.watch',
             'instagram.com', 'twitter.com', 'x.com', 'tiktok.com',
             'vimeo.com', 'dailymotion.com'
-        ]
+        ] + list(getattr(settings, 'EXTRA_SUPPORTED_DOMAINS', []))
         
         try:
             parsed_url = urlparse(url.strip())
@@ -68,8 +167,108 @@ class VideoDownloaderService:
         except Exception as e:
             return False, f"Invalid URL format: {str(e)}"
     
+    def canonical_video_id(self, url):
+        """Return (platform, video_id) identifying the video behind a URL"""
+        return _canonical_video_id(url.strip())
+    
+    def format_key(self, format_id=None, quality=None, download_type='video'):
+        """Stable key for the requested format, used to index download jobs"""
+        if download_type == 'audio':
+            return 'audio'
+        return format_id or quality or 'best'
+    
+    def _extract_with_proxy(self, url, ydl_opts, **kwargs):
+        """ydl.extract_info through the video's egress proxy.
+        
+        If the proxy is blocked or unreachable the extraction is retried from
+        another one, up to EGRESS_PROXY_MAX_SWITCHES times.
+        """
+        key = self.canonical_video_id(url)
+        tried = set()
+        while True:
+            proxy = self.proxies.choose(key, exclude=tried)
+            opts = dict(ydl_opts, proxy=proxy.ydl_proxy) if proxy is not None else ydl_opts
+            try:
+                with yt_dlp.YoutubeDL(opts) as ydl:
+                    info = ydl.extract_info(url, download=False, **kwargs)
+            except yt_dlp.DownloadError as e:
+                outcome = self.proxies.report_error(proxy, str(e))
+                if proxy is None or outcome is None or len(tried) >= self.proxies.max_switches:
+                    raise
+                tried.add(proxy.name)
+                logger.warning(f"Extraction through proxy {proxy.name} failed ({outcome}), switching proxy")
+                continue
+            self.proxies.report(proxy, 'success')
+            return info
+    
+    def _info_cache_key(self, url):
+        platform, video_id = self.canonical_video_id(url)
+        return f"info:{platform}:{video_id}"
+    
+    def _info_etag_key(self, url):
+        platform, video_id = self.canonical_video_id(url)
+        return f"info-etag:{platform}:{video_id}"
+    
+    def _load_cached_info(self, url):
+        """Return (video_info, etag) cached by any node for this video, or (None, None)"""
+        try:
+            entry = get_backend().cache_get(self._info_cache_key(url))
+        except Exception as e:
+            logger.warning(f"Info cache lookup failed: {e}")
+            return None, None
+        if not entry:
+            return None, None
+        video_info = entry['video_info']
+        if video_info.get('formats'):
+            video_info['formats'] = [FormatRecord.from_dict(f) for f in video_info['formats']]
+        return video_info, entry['etag']
+    
+    def get_cached_info(self, url):
+        """Return metadata cached by any node for this video, if present"""
+        return self._load_cached_info(url)[0]
+    
+    def cached_info_etag(self, url):
+        """Fingerprint of the cached metadata, read from its own small key"""
+        try:
+            return get_backend().cache_get(self._info_etag_key(url))
+        except Exception as e:
+            logger.warning(f"Info ETag lookup failed: {e}")
+            return None
+    
+    def cache_info(self, url, video_info):
+        """Cache metadata for all nodes; returns its ETag fingerprint"""
+        serialized = serialize_video_info(video_info)
+        etag = info_etag(serialized)
+        try:
+            ttl = getattr(settings, 'INFO_CACHE_TTL', 600)
+            # ETag first, so it expires before the entry it describes
+            get_backend().cache_set(self._info_etag_key(url), etag, ttl)
+            get_backend().cache_set(self._info_cache_key(url), {'etag': etag, 'video_info': serialized}, ttl)
+        except Exception as e:
+            logger.warning(f"Info cache store failed: {e}")
+        return etag
+    
     def extract_video_info(self, url):
         """Extract video information including available formats"""
+        success, result, _ = self.extract_video_info_with_etag(url)
+        return success, result
+    
+    def extract_video_info_with_etag(self, url):
+        """Like extract_video_info, plus the ETag fingerprint of the info (None on failure)"""
+        with maybe_profile('extract_video_info'), span('info.total', url=url) as total:
+            success, result, etag = self._extract_video_info(url)
+            total['success'] = success
+        return success, result, etag
+    
+    def _extract_video_info(self, url):
+        platform = self.canonical_video_id(url)[0]
+        with span('info.cache_lookup') as lookup:
+            cached, etag = self._load_cached_info(url)
+            lookup['hit'] = cached is not None
+        if cached is not None:
+            EXTRACTIONS.inc(platform, 'cached')
+            return True, cached, etag
+        
         ydl_opts = {
             'quiet': True,
             'no_warnings': True,
@@ -83,221 +282,239 @@ class VideoDownloaderService:
         }
         
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                # Extract relevant information
-                video_info = {
-                    'title': info.get('title', 'Unknown Title'),
-                    'duration': info.get('duration', 0),
-                    'uploader': info.get('uploader', 'Unknown'),
-                    'view_count': info.get('view_count', 0),
-                    'upload_date': info.get('upload_date', ''),
-                    'thumbnail': info.get('thumbnail', ''),
-                    'description': info.get('description', ''),
-                    'formats': []
-                }
-                
-                # Process available formats
-                formats = info.get('formats', [])
+            with span('info.extract', platform=platform), EXTRACTION_SECONDS.time(platform):
+                info = self._extract_with_proxy(url, ydl_opts)
+            
+            # Extract relevant information
+            video_info = {
+                'title': info.get('title', 'Unknown Title'),
+                'duration': info.get('duration', 0),
+                'uploader': info.get('uploader', 'Unknown'),
+                'view_count': info.get('view_count', 0),
+                'upload_date': info.get('upload_date', ''),
+                'thumbnail': info.get('thumbnail', ''),
+                'thumbnail_proxy': thumbnail_proxy_url(info.get('thumbnail')),
+                'description': info.get('description', ''),
+                'formats': []
+            }
+            
+            # Process available formats
+            formats = info.get('formats', [])
+            with span('info.process_formats', formats=len(formats)):
                 processed_formats = self.process_formats(formats)
-                video_info['formats'] = processed_formats
-                
-                return True, video_info
-                
+            video_info['formats'] = processed_formats
+            
+            with span('info.cache_store'):
+                etag = self.cache_info(url, video_info)
+            EXTRACTIONS.inc(platform, 'success')
+            return True, video_info, etag
+            
         except yt_dlp.DownloadError as e:
             logger.error(f"yt-dlp download error: {str(e)}")
-            return False, f"Failed to extract video info: {str(e)}"
+            EXTRACTIONS.inc(platform, 'failed')
+            return False, f"Failed to extract video info: {str(e)}", None
         except Exception as e:
             logger.error(f"Unexpected error in extract_video_info: {str(e)}")
+            EXTRACTIONS.inc(platform, 'failed')
+            return False, f"An unexpected error occurred: {str(e)}", None
+    
+    def extract_basic_info(self, url):
+        """Cheap first-paint metadata: title, thumbnail, uploader, duration.
+        
+        Uses a cached full extraction if one exists, then the platform's oEmbed
+        endpoint, then an unprocessed yt-dlp extraction that skips format
+        resolution. That last step only runs when there is no oEmbed endpoint
+        or the lookup failed on the route (timeout, refused, rate limited).
+        The result carries 'formats': None until stage two.
+        """
+        cached = self.get_cached_info(url)
+        if cached is not None:
+            return True, {key: cached.get(key) for key in BASIC_INFO_FIELDS}
+        
+        oembed_info, oembed_error = self._fetch_oembed(url)
+        if oembed_info is not None:
+            return True, oembed_info
+        if oembed_error and oembed_error.startswith('HTTP Error') and classify_error(oembed_error) is None:
+            # The platform answered about the video itself (missing, private...);
+            # a yt-dlp lookup would only repeat that. Stage two reports it.
+            return False, f"Failed to extract video info: {oembed_error}"
+        
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': True,
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'referer': 'https://www.youtube.com/',
+        }
+        
+        try:
+            info = self._extract_with_proxy(url, ydl_opts, process=False)
+        except yt_dlp.DownloadError as e:
+            logger.error(f"yt-dlp basic info error: {str(e)}")
+            return False, f"Failed to extract video info: {str(e)}"
+        except Exception as e:
+            logger.error(f"Unexpected error in extract_basic_info: {str(e)}")
             return False, f"An unexpected error occurred: {str(e)}"
+        
+        thumbnail = info.get('thumbnail')
+        if not thumbnail and info.get('thumbnails'):
+            thumbnail = info['thumbnails'][-1].get('url')
+        return True, {
+            'title': info.get('title', 'Unknown Title'),
+            'duration': info.get('duration', 0),
+            'uploader': info.get('uploader', 'Unknown'),
+            'thumbnail': thumbnail or '',
+            'thumbnail_proxy': thumbnail_proxy_url(thumbnail),
+            'formats': None,
+        }
     
-    def process_formats(self, formats):
-        """Process and categorize available formats"""
-        processed_formats = []
-        seen_qualities = set()
-        
-        # Separate video and audio formats
-        video_formats = []
-        audio_formats = []
-        combined_formats = []  # Formats that already have both video and audio
-        
-        for f in formats:
-            vcodec = f.get('vcodec', 'none')
-            acodec = f.get('acodec', 'none')
-            height = f.get('height')
-            
-            if vcodec != 'none' and acodec != 'none' and height:
-                # Format has both video and audio
-                combined_formats.append(f)
-            elif vcodec != 'none' and height and isinstance(height, (int, float)) and height > 0:
-                # Video only format
-                format_id = f.get('format_id', '')
-                protocol = f.get('protocol', '')
-                
-                # Skip problematic formats
-                if protocol in ['m3u8_native'] and 'hls' in format_id:
-                    continue
-                
-                video_formats.append(f)
-            elif acodec != 'none' and vcodec == 'none':
-                # Audio only format
-                audio_formats.append(f)
-        
-        # Sort formats by quality
-        def sort_key(x):
-            height = x.get('height', 0) or 0
-            fps = x.get('fps', 0) or 0
-            return (height, fps)
-        
-        # Process combined formats first (these don't need merging)
-        combined_formats.sort(key=sort_key, reverse=True)
-        for fmt in combined_formats:
-            height = fmt.get('height')
-            if not height or height <= 0:
-                continue
-                
-            quality_id = f"{height}p"
-            fps = fmt.get('fps') or 30
-            if fps > 30:
-                quality_id += f"{fps}"
-            
-            if quality_id not in seen_qualities:
-                seen_qualities.add(quality_id)
-                
-                filesize = fmt.get('filesize') or fmt.get('filesize_approx')
-                
-                format_info = {
-                    'format_id': fmt.get('format_id'),
-                    'quality': f"{quality_id} (ready to download)",
-                    'height': height,
-                    'width': fmt.get('width') or 0,
-                    'fps': fps,
-                    'ext': fmt.get('ext', 'mp4'),
-                    'vcodec': fmt.get('vcodec', 'unknown'),
-                    'acodec': fmt.get('acodec', 'unknown'),
-                    'has_audio': True,
-                    'filesize': filesize,
-                    'filesize_mb': f"{round(filesize / (1024 * 1024), 1)} MB" if filesize else "Unknown",
-                    'category': self.get_quality_category(height),
-                    'note': "Complete video with audio - no merging needed",
-                    'protocol': fmt.get('protocol', 'https'),
-                    'will_merge': False,
-                    'is_large': filesize and filesize > 1024 * 1024 * 1024,  # > 1GB
-                }
-                
-                processed_formats.append(format_info)
+    def _fetch_oembed(self, url):
+        """Look the URL up on its platform's oEmbed endpoint, if it has one.
         
-        # Process video-only formats (these will need merging)
-        video_formats.sort(key=sort_key, reverse=True)
+        Returns (info, None) on success, (None, error text) if the lookup
+        failed and (None, None) if the platform has no endpoint.
+        """
+        platform, _ = self.canonical_video_id(url)
+        endpoint = OEMBED_ENDPOINTS.get(platform)
+        if not endpoint:
+            return None, None
         
-        # Get best audio format for size estimation
-        best_audio = None
-        if audio_formats:
-            best_audio = max(audio_formats, key=lambda x: x.get('abr', 0) or 0)
+        request = urllib.request.Request(
+            f"{endpoint}?format=json&url={quote(url, safe='')}",
+            headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=getattr(settings, 'OEMBED_TIMEOUT', 3)) as response:
+                data = json.loads(response.read(256 * 1024))
+        except Exception as e:
+            logger.info(f"oEmbed lookup failed for {url}: {e}")
+            return None, str(e)
         
-        for fmt in video_formats:
-            height = fmt.get('height')
-            if not height or height <= 0:
-                continue
-            
-            quality_id = f"{height}p"
-            fps = fmt.get('fps') or 30
-            if fps > 30:
-                quality_id += f"{fps}"
-            
-            # Skip if we already have this quality from combined formats
-            if quality_id in seen_qualities:
-                continue
-                
-            seen_qualities.add(quality_id)
-            
-            video_filesize = fmt.get('filesize') or fmt.get('filesize_approx')
-            
-            # Calculate estimated combined size
-            estimated_size = None
-            estimated_size_mb = None
-            is_large = False
-            
-            if video_filesize and best_audio and best_audio.get('filesize'):
-                estimated_size = video_filesize + best_audio.get('filesize')
-                estimated_size_mb = round(estimated_size / (1024 * 1024), 1)
-                is_large = estimated_size > 1024 * 1024 * 1024  # > 1GB
-            elif video_filesize:
-                estimated_size = int(video_filesize * 1.1)
-                estimated_size_mb = round(estimated_size / (1024 * 1024), 1)
-                is_large = estimated_size > 1024 * 1024 * 1024  # > 1GB
-            
-            # Add warning for large files
-            quality_display = f"{quality_id} (video + audio)"
-            note = "Video will be merged with audio"
-            
-            if is_large:
-                quality_display += " ⚠️"
-                note += " - Large file, merging may take time"
-            
-            format_info = {
-                'format_id': fmt.get('format_id'),
-                'quality': quality_display,
-                'height': height,
-                'width': fmt.get('width') or 0,
-                'fps': fps,
-                'ext': 'mp4',
-                'vcodec': fmt.get('vcodec', 'unknown'),
-                'acodec': 'merged',
-                'has_audio': False,
-                'filesize': estimated_size,
-                'filesize_mb': f"{round(estimated_size / (1024 * 1024), 1)} MB" if estimated_size else "Unknown",
-                'category': self.get_quality_category(height),
-                'note': note,
-                'protocol': fmt.get('protocol', 'https'),
-                'will_merge': True,
-                'is_large': is_large,
-            }
-            
-            processed_formats.append(format_info)
-        
-        # Add audio-only option
-        if audio_formats:
-            best_audio = max(audio_formats, key=lambda x: x.get('abr', 0) or 0)
-            processed_formats.append({
-                'format_id': best_audio.get('format_id'),
-                'quality': 'Audio Only (MP3)',
-                'height': 0,
-                'width': 0,
-                'fps': 0,
-                'ext': 'mp3',
-                'vcodec': 'none',
-                'acodec': best_audio.get('acodec', 'unknown'),
-                'has_audio': True,
-                'filesize': best_audio.get('filesize'),
-                'filesize_mb': f"{round(best_audio.get('filesize', 0) / (1024 * 1024), 1)} MB" if best_audio.get('filesize') else "Unknown",
-                'category': 'Audio',
-                'note': 'Audio only - converted to MP3',
-                'protocol': best_audio.get('protocol', 'https'),
-                'will_merge': False,
-                'is_large': False,
-            })
+        return {
+            'title': data.get('title') or 'Unknown Title',
+            'duration': data.get('duration') or 0,
+            'uploader': data.get('author_name') or 'Unknown',
+            'thumbnail': data.get('thumbnail_url') or '',
+            'thumbnail_proxy': thumbnail_proxy_url(data.get('thumbnail_url')),
+            'formats': None,
+        }, None
+    
+    def extract_playlist_entries(self, url, limit=None):
+        """List the video URLs of a playlist (or the URL itself for a single video)"""
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': 'in_playlist',
+            'noplaylist': False,
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'extractor_retries': 3,
+        }
+        if limit:
+            ydl_opts['playlistend'] = limit
         
-        return processed_formats
+        try:
+            info = self._extract_with_proxy(url, ydl_opts)
+        except yt_dlp.DownloadError as e:
+            logger.error(f"yt-dlp playlist error: {str(e)}")
+            return False, f"Failed to read playlist: {str(e)}"
+        except Exception as e:
+            logger.error(f"Unexpected error in extract_playlist_entries: {str(e)}")
+            return False, f"An unexpected error occurred: {str(e)}"
+        
+        if info.get('_type') not in ('playlist', 'multi_video'):
+            return True, [info.get('webpage_url') or url]
+        
+        entry_urls = []
+        for entry in info.get('entries') or []:
+            if not entry:
+                continue
+            entry_url = entry.get('webpage_url') or entry.get('url')
+            if entry_url:
+                entry_urls.append(entry_url)
+        return True, entry_urls[:limit] if limit else entry_urls
+    
+    def process_formats(self, formats):
+        """Process and categorize available formats into FormatRecords"""
+        return build_format_table(formats)
     
     def get_quality_category(self, height):
         """Categorize video quality based on height"""
-        if height >= 2160:
-            return '4K'
-        elif height >= 1440:
-            return '2K'
-        elif height >= 1080:
-            return 'Full HD'
-        elif height >= 720:
-            return 'HD'
-        elif height >= 480:
-            return 'SD'
-        else:
-            return 'Low'
+        return get_quality_category(height)
+    
+    def download_video(self, url, format_id=None, quality=None, download_type='video', job_id=None, progress_hook=None,
+                       extra_opts=None):
+        """Download video with specified quality and record it as a DownloadJob."""
+        job = self._create_job(url, format_id, quality, download_type, job_id)
+        
+        ACTIVE_JOBS.inc()
+        try:
+            with drain_controller.track(), bind(job_id=job.job_id if job else job_id), maybe_profile('download_video'), \
+                    span('download.total', url=url, download_type=download_type) as total:
+                with span('download.prefetch_claim') as claim:
+                    prefetched = self.prefetcher.claim(url, format_id, quality, download_type)
+                    claim['hit'] = bool(prefetched)
+                if prefetched:
+                    success, (result, title) = True, prefetched
+                else:
+                    success, result, title = self._download_video(
+                        url, format_id, quality, download_type, progress_hook, extra_opts)
+                total['success'] = success
+        finally:
+            ACTIVE_JOBS.dec()
+        outcome = 'prefetched' if prefetched else _download_outcome(success, result)
+        DOWNLOADS.inc(self.canonical_video_id(url)[0], outcome)
+        
+        if job is not None:
+            try:
+                if success:
+                    job.mark_succeeded(result, title, os.path.getsize(result))
+                elif outcome == 'cancelled':
+                    job.mark_failed(result, state=DownloadJob.STATE_CANCELLED)
+                else:
+                    job.mark_failed(result)
+            except Exception as e:
+                logger.warning(f"Failed to record download job {job.job_id}: {e}")
+        
+        return success, result, title
     
-    def download_video(self, url, format_id=None, quality=None, download_type='video'):
-        """Download video with specified quality, with fallback for 403 errors."""
+    def _create_job(self, url, format_id, quality, download_type, job_id=None):
+        """Persist a running DownloadJob; recording never blocks a download.
+
+        A known job_id (a queued job handed back after a drain, or a client
+        retry) resets its existing row instead of inserting a duplicate.
+        """
+        try:
+            platform, video_id = self.canonical_video_id(url)
+            fields = {
+                'url': url,
+                'platform': platform,
+                'video_id': video_id,
+                'format': self.format_key(format_id, quality, download_type),
+                'download_type': download_type,
+                'state': DownloadJob.STATE_RUNNING,
+                'started_at': timezone.now(),
+                'finished_at': None,
+                'output_path': '',
+                'bytes_total': None,
+                'error': '',
+            }
+            if job_id:
+                job, _ = DownloadJob.objects.update_or_create(job_id=job_id, defaults=fields)
+            else:
+                job = DownloadJob.objects.create(**fields)
+            return job
+        except Exception as e:
+            logger.warning(f"Failed to record download job for {url}: {e}")
+            return None
+    
+    def _download_video(self, url, format_id=None, quality=None, download_type='video', progress_hook=None, extra_opts=None,
+                        lane=None):
+        """Download video with specified quality, with fallback for 403 errors.
+        
+        Downloads queue for a scheduler lane picked from their size. A caller
+        with its own concurrency cap (the prefetcher) passes `lane` to run
+        outside the scheduler under that label instead.
+        """
         
         logger.info(f"Download type received: {download_type}, Selected quality: {quality}, Selected format_id: {format_id}")
         
@@ -331,11 +548,19 @@ class VideoDownloaderService:
             format_selectors_to_try.append(fallback_format_selector)
         
         final_error_message = "Download failed after multiple attempts."
+        platform = self.canonical_video_id(url)[0]
+        # Egress proxies that were blocked or failed for this video
+        blocked_proxies = set()
+        # Proxy that got a 403 for every format tried; counted against it only at the end
+        forbidden_proxy = None
 
-        for current_format_selector in format_selectors_to_try:
+        for index, current_format_selector in enumerate(format_selectors_to_try):
             logger.info(f"Attempting download with format selector: {current_format_selector}")
             
-            temp_dir = tempfile.mkdtemp()
+            temp_dir = self.scratch.lease()
+            # Partial files left by a drained restart let yt-dlp continue the download
+            checkpoint_key = self.canonical_video_id(url) + (download_type, current_format_selector)
+            drain_controller.restore(checkpoint_key, temp_dir)
             
             ydl_opts = {
                 'format': current_format_selector,
@@ -358,6 +583,20 @@ class VideoDownloaderService:
                 'socket_timeout': 300,  # 5 minutes
             }
             
+            ydl_opts['postprocessor_hooks'] = [postprocessor_timer(), postprocessor_span_hook()]
+            ydl_opts['progress_hooks'] = [download_span_hook(), drain_controller.abort_hook()]
+            if progress_hook:
+                ydl_opts['progress_hooks'].append(progress_hook)
+            
+            # The same proxy for extraction and download keeps signed media URLs valid
+            proxy = self.proxies.choose(self.canonical_video_id(url), exclude=blocked_proxies)
+            transfer = {}
+            if proxy is not None:
+                ydl_opts['proxy'] = proxy.ydl_proxy
+                ydl_opts['progress_hooks'].append(transfer_hook(transfer))
+            if extra_opts:
+                ydl_opts.update(extra_opts)
+            
             if download_type == 'audio':
                 ydl_opts['postprocessors'] = [{
                     'key': 'FFmpegExtractAudio',
@@ -380,12 +619,43 @@ class VideoDownloaderService:
             
             try:
                 with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
+                    with span('download.extract', platform=platform, format=current_format_selector):
+                        info = ydl.extract_info(url, download=False)
                     title = info.get('title', 'video')
                     
-                    ydl.download([url])
+                    # Refuse to start a job that would fill the scratch disk
+                    estimated_size = self._estimate_filesize(info)
+                    has_room, free, needed = self.scratch.has_room_for(estimated_size)
+                    if not has_room:
+                        final_error_message = "Not enough free disk space to download this video right now. Please try again later or choose a smaller format."
+                        logger.error(f"Disk admission refused: estimated={estimated_size} needed={needed} free={free}")
+                        self._cleanup_temp_dir(temp_dir)
+                        return False, final_error_message, None
                     
-                    downloaded_files = os.listdir(temp_dir)
+                    if lane is None:
+                        # Small jobs get their own lane so one 4K merge can't block them
+                        fetch_lane = self.scheduler.classify(
+                            download_type,
+                            estimated_size=estimated_size,
+                            duration=info.get('duration'),
+                            will_merge=len(info.get('requested_formats') or []) > 1,
+                            height=info.get('height'),
+                        )
+                        slot = self.scheduler.slot(fetch_lane)
+                    else:
+                        fetch_lane, slot = lane, nullcontext()
+                    with slot, self.proxies.using(proxy), DOWNLOAD_SECONDS.time(platform, fetch_lane), \
+                            span('download.fetch', lane=fetch_lane, estimated_size=estimated_size):
+                        ydl.download([url])
+                    # A rate-limited download says nothing about the proxy's speed
+                    throttled = bool(ydl_opts.get('ratelimit'))
+                    self.proxies.report(
+                        proxy, 'success',
+                        nbytes=0 if throttled else transfer.get('bytes', 0),
+                        seconds=transfer.get('seconds', 0.0),
+                    )
+                    
+                    downloaded_files = [f for f in os.listdir(temp_dir) if not f.startswith('.')]
                     if downloaded_files:
                         downloaded_file = os.path.join(temp_dir, downloaded_files[0])
                         if os.path.exists(downloaded_file) and os.path.getsize(downloaded_file) > 0:
@@ -404,13 +674,24 @@ class VideoDownloaderService:
                         
             except yt_dlp.DownloadError as e:
                 error_msg = str(e)
+                proxy_outcome = self.proxies.report_error(proxy, error_msg)
+                if proxy is not None and proxy_outcome and len(blocked_proxies) < self.proxies.max_switches:
+                    # The route failed, not the format: retry this selector from another proxy
+                    logger.warning(f"Download through proxy {proxy.name} failed ({proxy_outcome}), switching proxy")
+                    blocked_proxies.add(proxy.name)
+                    self._cleanup_temp_dir(temp_dir)
+                    format_selectors_to_try.insert(index + 1, current_format_selector)
+                    continue
                 if "timeout" in error_msg.lower() or "merge" in error_msg.lower():
                     final_error_message = "Download timed out during merging. Try a smaller file size or audio-only option."
                     logger.error(final_error_message)
+                    self._cleanup_temp_dir(temp_dir)
                     return False, final_error_message, None # This is a critical error, no point in retrying with other formats
                 elif "http error 403" in error_msg.lower() or "requested format is not available" in error_msg.lower():
+                    forbidden_proxy = proxy if "http error 403" in error_msg.lower() else None
                     final_error_message = f"Format unavailable or restricted: {error_msg}. Trying next available format if possible."
                     logger.warning(final_error_message)
+                    FORMAT_FALLBACKS.inc(platform)
                     self._cleanup_temp_dir(temp_dir)
                     continue # Try next format selector
                 else:
@@ -418,20 +699,62 @@ class VideoDownloaderService:
                     logger.error(final_error_message)
                     self._cleanup_temp_dir(temp_dir)
                     return False, final_error_message, None # Other download errors are likely fatal for all formats
+            except DrainCancelled:
+                final_error_message = "Download interrupted by a server restart. Please try again; it will resume where it stopped."
+                logger.warning(final_error_message)
+                drain_controller.checkpoint(
+                    checkpoint_key, temp_dir,
+                    url=url, format_id=format_id, quality=quality, download_type=download_type,
+                )
+                self._cleanup_temp_dir(temp_dir)
+                return False, final_error_message, None
+            except DownloadCancelled as e:
+                # Stopped on purpose by a progress hook (e.g. a superseded prefetch)
+                final_error_message = f"Download cancelled: {e}"
+                logger.info(final_error_message)
+                self._cleanup_temp_dir(temp_dir)
+                return False, final_error_message, None
             except Exception as e:
                 final_error_message = f"An unexpected error occurred: {str(e)}"
                 logger.error(final_error_message)
                 self._cleanup_temp_dir(temp_dir)
                 return False, final_error_message, None
-            finally:
-                # Ensure temp directory is cleaned up even if an unexpected error occurs
+            except BaseException:
+                # Interrupted mid-job: the directory must not outlive us
                 self._cleanup_temp_dir(temp_dir)
+                raise
         
+        if forbidden_proxy is not None:
+            # A 403 on one format is the platform's; on every format it may be the route
+            self.proxies.report(forbidden_proxy, 'failed')
         return False, final_error_message, None # If all attempts fail
 
 # Initialize service
 downloader_service = VideoDownloaderService()
 
+def _queue_depths():
+    depths = {('scheduler',): downloader_service.scheduler.queue_depth()}
+    try:
+        depths[('backend',)] = get_backend().queue_depth()
+    except Exception as e:
+        logger.warning(f"Queue depth unavailable: {e}")
+    return depths
+
+# Gauges read at scrape time, so they cost nothing between scrapes
+QUEUE_DEPTH.set_function(_queue_depths)
+SCRATCH_USED_BYTES.set_function(downloader_service.scratch.used_bytes)
+SCRATCH_FREE_BYTES.set_function(downloader_service.scratch.free_bytes)
+PREFETCH_ENTRIES.set_function(lambda: {
+    (state,): value for state, value in downloader_service.prefetcher.stats().items()
+    if state in ('in_flight', 'ready')
+})
+
+# Background extractions for the progressive info endpoint
+info_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'INFO_EXTRACTION_WORKERS', 8),
+    thread_name_prefix='info'
+)
+
 def index(request):
     """Main page view"""
     return render(request, 'index.html')
@@ -457,31 +780,23 @@ def youtube_downloader(request):
                 return render(request, 'index.html')
         
         if action == 'get_info':
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return video_info_response(request, url, parse_fields(request.POST.get('fields')))
+            
             # Extract video information and available formats
             success, video_info = downloader_service.extract_video_info(url)
             
             if success:
-                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    return JsonResponse({
-                        'success': True,
-                        'video_info': video_info
-                    })
-                else:
-                    context = {
-                        'video_info': video_info,
-                        'url': url,
-                        'show_formats': True
-                    }
-                    return render(request, 'index.html', context)
+                downloader_service.prefetcher.maybe_prefetch(url, video_info)
+                context = {
+                    'video_info': video_info,
+                    'url': url,
+                    'show_formats': True
+                }
+                return render(request, 'index.html', context)
             else:
-                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    return JsonResponse({
-                        'success': False,
-                        'error': video_info
-                    })
-                else:
-                    messages.error(request, f"Failed to get video info: {video_info}")
-                    return render(request, 'index.html')
+                messages.error(request, f"Failed to get video info: {video_info}")
+                return render(request, 'index.html')
         
         elif action == 'download':
             # Determine download_type based on selected_quality for explicit passing
@@ -496,29 +811,17 @@ def youtube_downloader(request):
                 url, 
                 format_id=selected_format, 
                 quality=selected_quality,
-                download_type=effective_download_type # Pass the determined type explicitly
+                download_type=effective_download_type, # Pass the determined type explicitly
+                job_id=request.POST.get('job_id') or None
             )
             
             if success:
                 # Serve the file for download
                 try:
-                    with open(result, 'rb') as file:
-                        response = HttpResponse(
-                            file.read(),
-                            content_type='application/octet-stream'
-                        )
-                        filename = os.path.basename(result)
-                        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-                        
-                        # Clean up temp file after serving
-                        try:
-                            os.remove(result)
-                            os.rmdir(os.path.dirname(result))
-                        except:
-                            pass
-                            
-                        return response
+                    # The scratch directory is released once the file has been sent
+                    return serve_download(result, lambda: downloader_service.release_download(result))
                 except Exception as e:
+                    downloader_service.release_download(result)
                     messages.error(request, f"Failed to serve download: {str(e)}")
                     return render(request, 'index.html')
             else:
@@ -542,6 +845,7 @@ def facebook_downloader(request):
         if request.POST.get('action') == 'get_info':
             success, video_info = downloader_service.extract_video_info(url)
             if success:
+                downloader_service.prefetcher.maybe_prefetch(url, video_info)
                 context = {
                     'video_info': video_info,
                     'url': url,
@@ -565,28 +869,15 @@ def facebook_downloader(request):
             url, 
             format_id=selected_format, 
             quality=selected_quality,
-            download_type=effective_download_type
+            download_type=effective_download_type,
+            job_id=request.POST.get('job_id') or None
         )
         
         if success:
             try:
-                with open(result, 'rb') as file:
-                    response = HttpResponse(
-                        file.read(),
-                        content_type='application/octet-stream'
-                    )
-                    filename = os.path.basename(result)
-                    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-                    
-                    # Clean up
-                    try:
-                        os.remove(result)
-                        os.rmdir(os.path.dirname(result))
-                    except:
-                        pass
-                        
-                    return response
+                return serve_download(result, lambda: downloader_service.release_download(result))
             except Exception as e:
+                downloader_service.release_download(result)
                 messages.error(request, f"Failed to serve download: {str(e)}")
                 return render(request, 'facebook.html')
         else:
@@ -608,6 +899,7 @@ def instagram_downloader(request):
         if request.POST.get('action') == 'get_info':
             success, video_info = downloader_service.extract_video_info(url)
             if success:
+                downloader_service.prefetcher.maybe_prefetch(url, video_info)
                 context = {
                     'video_info': video_info,
                     'url': url,
@@ -630,28 +922,15 @@ def instagram_downloader(request):
             url, 
             format_id=selected_format, 
             quality=selected_quality,
-            download_type=effective_download_type
+            download_type=effective_download_type,
+            job_id=request.POST.get('job_id') or None
         )
         
         if success:
             try:
-                with open(result, 'rb') as file:
-                    response = HttpResponse(
-                        file.read(),
-                        content_type='application/octet-stream'
-                    )
-                    filename = os.path.basename(result)
-                    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-                    
-                    # Clean up
-                    try:
-                        os.remove(result)
-                        os.rmdir(os.path.dirname(result))
-                    except:
-                        pass
-                        
-                    return response
+                return serve_download(result, lambda: downloader_service.release_download(result))
             except Exception as e:
+                downloader_service.release_download(result)
                 messages.error(request, f"Failed to serve download: {str(e)}")
                 return render(request, 'instagram.html')
         else:
@@ -673,6 +952,7 @@ def twitter_downloader(request):
         if request.POST.get('action') == 'get_info':
             success, video_info = downloader_service.extract_video_info(url)
             if success:
+                downloader_service.prefetcher.maybe_prefetch(url, video_info)
                 context = {
                     'video_info': video_info,
                     'url': url,
@@ -695,28 +975,15 @@ def twitter_downloader(request):
             url, 
             format_id=selected_format, 
             quality=selected_quality,
-            download_type=effective_download_type
+            download_type=effective_download_type,
+            job_id=request.POST.get('job_id') or None
         )
         
         if success:
             try:
-                with open(result, 'rb') as file:
-                    response = HttpResponse(
-                        file.read(),
-                        content_type='application/octet-stream'
-                    )
-                    filename = os.path.basename(result)
-                    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-                    
-                    # Clean up
-                    try:
-                        os.remove(result)
-                        os.rmdir(os.path.dirname(result))
-                    except:
-                        pass
-                        
-                    return response
+                return serve_download(result, lambda: downloader_service.release_download(result))
             except Exception as e:
+                downloader_service.release_download(result)
                 messages.error(request, f"Failed to serve download: {str(e)}")
                 return render(request, 'twitter.html')
         else:
@@ -725,13 +992,51 @@ def twitter_downloader(request):
     
     return render(request, 'twitter.html')
 
+def video_info_response(request, url, fields=None):
+    """Projected, compressed video info JSON with ETag revalidation.
+    
+    The cached info's fingerprint is stored under its own small cache key,
+    so when the client's If-None-Match matches it a 304 is returned without
+    loading, deserializing or serializing the payload.
+    """
+    cached_etag = downloader_service.cached_info_etag(url)
+    if cached_etag:
+        etag = response_etag(cached_etag, fields)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    
+    success, video_info, base_etag = downloader_service.extract_video_info_with_etag(url)
+    if not success:
+        return JsonResponse({
+            'success': False,
+            'error': video_info
+        })
+    
+    downloader_service.prefetcher.maybe_prefetch(url, video_info)
+    
+    etag = response_etag(base_etag, fields)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    return compressed_json_response(request, {
+        'success': True,
+        'video_info': project_info(video_info, fields)
+    }, etag=etag)
+
 @csrf_exempt
 def get_video_info_ajax(request):
-    """AJAX endpoint to get video information"""
-    if request.method == 'POST':
+    """AJAX endpoint to get video information.
+    
+    Accepts GET ?url=...&fields=... (revalidatable by the browser cache) or a
+    POST JSON body {"url": ..., "fields": ...}.
+    """
+    if request.method in ('GET', 'POST'):
         try:
-            data = json.loads(request.body)
-            url = data.get('url', '').strip()
+            if request.method == 'GET':
+                data = request.GET
+            else:
+                data = json.loads(request.body)
+            url = (data.get('url') or '').strip()
             
             is_valid, validation_message = downloader_service.validate_url(url)
             if not is_valid:
@@ -740,18 +1045,7 @@ def get_video_info_ajax(request):
                     'error': validation_message
                 })
             
-            success, video_info = downloader_service.extract_video_info(url)
-            
-            if success:
-                return JsonResponse({
-                    'success': True,
-                    'video_info': video_info
-                })
-            else:
-                return JsonResponse({
-                    'success': False,
-                    'error': video_info
-                })
+            return video_info_response(request, url, parse_fields(data.get('fields')))
                 
         except Exception as e:
             return JsonResponse({
@@ -764,12 +1058,377 @@ def get_video_info_ajax(request):
         'error': 'Invalid request method'
     })
 
-def download_progress(request):
-    """WebSocket or long-polling endpoint for download progress"""
-    # This would require additional setup for real-time progress
-    # For now, return a simple JSON response
+@csrf_exempt
+def enqueue_download(request):
+    """Queue a download on the shared job backend for any worker node to run"""
+    if request.method != 'POST':
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid request method'
+        }, status=405)
+    
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON body'
+        }, status=400)
+    
+    url = (data.get('url') or '').strip()
+    is_valid, validation_message = downloader_service.validate_url(url)
+    if not is_valid:
+        return JsonResponse({
+            'success': False,
+            'error': validation_message
+        }, status=400)
+    
+    format_id = data.get('format_id') or None
+    quality = data.get('quality') or None
+    download_type = 'audio' if data.get('download_type') == 'audio' or quality == 'Audio Only (MP3)' else 'video'
+    
+    platform, video_id = downloader_service.canonical_video_id(url)
+    format_key = downloader_service.format_key(format_id, quality, download_type)
+    job_id = get_backend().enqueue({
+        'url': url,
+        'format_id': format_id,
+        'quality': quality,
+        'download_type': download_type,
+    }, dedup_key=f"{platform}:{video_id}:{format_key}")
+    
+    return JsonResponse({
+        'success': True,
+        'job_id': job_id,
+        'status_url': reverse('job_status', args=[job_id]),
+    }, status=202)
+
+def job_status(request, job_id):
+    """Status of a queued job, answerable by any node"""
+    status = get_backend().get_status(job_id)
+    if status is None:
+        return JsonResponse({
+            'success': False,
+            'error': 'Unknown job'
+        }, status=404)
+    
+    result = status.pop('result') or {}
+    status.pop('payload', None)
+    if status['state'] == DownloadJob.STATE_SUCCEEDED:
+        status['title'] = result.get('title')
+        status['filesize'] = result.get('filesize')
+        status['download_url'] = reverse('job_file', args=[job_id])
+    
+    return JsonResponse({
+        'success': True,
+        'job': status
+    })
+
+def job_file(request, job_id):
+    """Serve the output of a finished job from the shared download directory"""
+    status = get_backend().get_status(job_id)
+    if not status or status['state'] != DownloadJob.STATE_SUCCEEDED:
+        raise Http404("Job has no file to serve")
+    
+    file_path = (status.get('result') or {}).get('path')
+    if not file_path or not os.path.exists(file_path):
+        raise Http404("Job output is no longer available")
+    
+    # Kept until JOB_OUTPUT_TTL so retried and resumed downloads still work
+    evict_job_outputs(downloader_service.download_dir)
+    return serve_download(file_path, keep=True)
+
+@csrf_exempt
+def batch_download(request):
+    """Download many URLs (or a playlist) in parallel and stream back a ZIP"""
+    if request.method != 'POST':
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid request method'
+        }, status=405)
+    
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON body'
+        }, status=400)
+    
+    max_items = getattr(settings, 'BATCH_MAX_ITEMS', 50)
+    urls = [u.strip() for u in data.get('urls') or [] if isinstance(u, str) and u.strip()]
+    
+    playlist_url = (data.get('playlist') or '').strip()
+    if playlist_url:
+        is_valid, validation_message = downloader_service.validate_url(playlist_url)
+        if not is_valid:
+            return JsonResponse({
+                'success': False,
+                'error': validation_message
+            }, status=400)
+        success, entries = downloader_service.extract_playlist_entries(playlist_url, limit=max_items)
+        if not success:
+            return JsonResponse({
+                'success': False,
+                'error': entries
+            }, status=502)
+        urls.extend(entries)
+    
+    # Validate and drop duplicates of the same video
+    accepted, rejected, seen = [], {}, set()
+    for url in urls:
+        is_valid, validation_message = downloader_service.validate_url(url)
+        if not is_valid:
+            rejected[url] = validation_message
+            continue
+        canonical = downloader_service.canonical_video_id(url)
+        if canonical in seen:
+            continue
+        seen.add(canonical)
+        accepted.append(url)
+    
+    if not accepted:
+        return JsonResponse({
+            'success': False,
+            'error': 'No valid URLs to download',
+            'rejected': rejected
+        }, status=400)
+    if len(accepted) > max_items:
+        return JsonResponse({
+            'success': False,
+            'error': f"Too many items: {len(accepted)} (limit {max_items})"
+        }, status=400)
+    
+    quality = data.get('quality') or 'best'
+    download_type = 'audio' if data.get('download_type') == 'audio' else 'video'
+    
+    response = StreamingHttpResponse(
+        stream_batch_zip(
+            downloader_service, accepted,
+            quality=quality,
+            download_type=download_type,
+            concurrency=getattr(settings, 'BATCH_CONCURRENCY', 3),
+            rejected=rejected,
+        ),
+        content_type='application/zip'
+    )
+    response['Content-Disposition'] = 'attachment; filename="speedy-download-batch.zip"'
+    return response
+
+def _ndjson_line(obj):
+    return (json.dumps(obj, cls=PayloadJSONEncoder) + '\n').encode()
+
+@csrf_exempt
+def bulk_video_info(request):
+    """Extract metadata for many URLs concurrently, streamed back as NDJSON.
+
+    One line is written per unique video as soon as its extraction finishes,
+    so the total latency tracks the slowest item rather than the sum.
+    """
+    if request.method != 'POST':
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid request method'
+        }, status=405)
+    
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON body'
+        }, status=400)
+    
+    urls = [u.strip() for u in data.get('urls') or [] if isinstance(u, str) and u.strip()]
+    fields = parse_fields(data.get('fields'))
+    max_urls = getattr(settings, 'BULK_INFO_MAX_URLS', 500)
+    if not urls:
+        return JsonResponse({
+            'success': False,
+            'error': 'No URLs given'
+        }, status=400)
+    if len(urls) > max_urls:
+        return JsonResponse({
+            'success': False,
+            'error': f"Too many URLs: {len(urls)} (limit {max_urls})"
+        }, status=400)
+    
+    # Validate, then group URLs that point at the same video
+    invalid = []
+    groups = {}
+    for url in urls:
+        is_valid, validation_message = downloader_service.validate_url(url)
+        if not is_valid:
+            invalid.append({'url': url, 'success': False, 'error': validation_message})
+            continue
+        groups.setdefault(downloader_service.canonical_video_id(url), []).append(url)
+    
+    extract = propagate(downloader_service.extract_video_info)
+    
+    def stream():
+        for line in invalid:
+            yield _ndjson_line(line)
+        
+        executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'BULK_INFO_CONCURRENCY', 8),
+            thread_name_prefix='bulk-info'
+        )
+        futures = {
+            executor.submit(extract, group[0]): (canonical, group)
+            for canonical, group in groups.items()
+        }
+        try:
+            for future in as_completed(futures):
+                (platform, video_id), group = futures[future]
+                line = {'url': group[0], 'urls': group, 'platform': platform, 'video_id': video_id}
+                try:
+                    success, video_info = future.result()
+                except Exception as e:
+                    success, video_info = False, f"An unexpected error occurred: {str(e)}"
+                line['success'] = success
+                line['video_info' if success else 'error'] = project_info(video_info, fields) if success else video_info
+                yield _ndjson_line(line)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    return StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+
+@csrf_exempt
+def progressive_video_info(request):
+    """Two-stage video info streamed as NDJSON.
+    
+    The full extraction starts immediately in the background; while it runs
+    a cheap lookup produces a {"stage": "basic"} line for first paint, and
+    the {"stage": "full"} line with the format list follows when ready.
+    Accepts a JSON body {"url": ..., "fields": ...} or the form fields
+    urlLink and fields.
+    """
+    if request.method != 'POST':
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid request method'
+        }, status=405)
+    
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            data = {}
+        url = (data.get('url') or '').strip()
+        fields = parse_fields(data.get('fields'))
+    else:
+        url = request.POST.get('urlLink', '').strip()
+        fields = parse_fields(request.POST.get('fields'))
+    
+    is_valid, validation_message = downloader_service.validate_url(url)
+    if not is_valid:
+        return JsonResponse({
+            'success': False,
+            'error': validation_message
+        }, status=400)
+    
+    extract = propagate(downloader_service.extract_video_info)
+    
+    def stream():
+        full = info_executor.submit(extract, url)
+        
+        if not full.done():
+            success, basic_info = downloader_service.extract_basic_info(url)
+            if success and not full.done():
+                yield _ndjson_line({'stage': 'basic', 'success': True, 'video_info': project_info(basic_info, fields)})
+        
+        # The extraction keeps running (and fills the cache) if the client leaves
+        success, video_info = full.result()
+        if success:
+            downloader_service.prefetcher.maybe_prefetch(url, video_info)
+        yield _ndjson_line({
+            'stage': 'full',
+            'success': success,
+            'video_info' if success else 'error': project_info(video_info, fields) if success else video_info
+        })
+    
+    response = StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def prefetch_stats(request):
+    """Hit-rate counters of the speculative prefetcher on this node"""
+    return JsonResponse({
+        'success': True,
+        'enabled': downloader_service.prefetcher.enabled,
+        'stats': downloader_service.prefetcher.stats()
+    })
+
+def scheduler_stats(request):
+    """Per-lane load and queue-wait percentiles of the download scheduler"""
+    return JsonResponse({
+        'success': True,
+        'lanes': downloader_service.scheduler.stats()
+    })
+
+def proxy_stats(request):
+    """Health, throughput and quarantine state of the egress proxies on this node"""
+    return JsonResponse({
+        'success': True,
+        'enabled': downloader_service.proxies.enabled,
+        'proxies': downloader_service.proxies.stats()
+    })
+
+def thumbnail(request, token):
+    """Resized, cached copy of a video thumbnail behind a signed link.
+    
+    ?w= picks the width (snapped to THUMBNAIL_WIDTHS); WebP is sent to clients
+    that accept it. If the source cannot be fetched the client is redirected
+    to it rather than shown a broken image.
+    """
+    source = unsign_thumbnail(token)
+    if source is None:
+        raise Http404("Invalid thumbnail link")
+    
+    width = thumbnail_cache.snap_width(request.GET.get('w'))
+    webp = 'image/webp' in request.headers.get('Accept', '')
+    try:
+        data, content_type = thumbnail_cache.get(source, width, webp=webp)
+    except ThumbnailError as e:
+        logger.info(f"Thumbnail proxy falling back to the source: {e}")
+        response = redirect(source)
+        response['Cache-Control'] = 'no-store'
+        return response
+    
+    response = HttpResponse(data, content_type=content_type)
+    # The link names the source and width, so the bytes behind it never change
+    response['Cache-Control'] = f"public, max-age={getattr(settings, 'THUMBNAIL_MAX_AGE', 365 * 24 * 3600)}, immutable"
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+def healthz_live(request):
+    """Liveness probe: the process is up and serving requests"""
+    return JsonResponse({'status': 'alive'})
+
+def healthz_ready(request):
+    """Readiness probe: 503 while draining so the load balancer moves traffic away"""
+    status = drain_controller.status()
+    return JsonResponse(status, status=503 if drain_controller.draining else 200)
+
+def metrics(request):
+    """Prometheus text exposition of this process's pipeline metrics"""
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def download_progress(request, job_id):
+    """Polling endpoint for the state of a download job"""
+    try:
+        job = DownloadJob.objects.get(job_id=job_id)
+    except DownloadJob.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'error': 'Unknown job'
+        }, status=404)
+    
+    status = job.as_status()
+    if job.state in (DownloadJob.STATE_QUEUED, DownloadJob.STATE_RUNNING):
+        # Jobs started earlier that are still queued or running on this site
+        status['jobs_ahead'] = DownloadJob.objects.active().filter(created_at__lt=job.created_at).count()
+    
     return JsonResponse({
-        'status': 'in_progress',
-        'progress': 50,  # This would be dynamic in a real implementation
-        'message': 'Downloading...'
+        'success': True,
+        'job': status
     })
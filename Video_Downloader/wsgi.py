@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Video_Downloader.settings')
 
 application = get_wsgi_application()
+
+from Video_App.drain import install_drain_handler  # noqa: E402
+
+install_drain_handler()
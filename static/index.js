@@ -0,0 +1,294 @@
+// Get CSRF token from cookie
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
+
+// Set CSRF token for all forms
+function setCSRFToken() {
+    const csrftoken = getCookie('csrftoken');
+    if (csrftoken) {
+        const csrfInputs = document.querySelectorAll('input[name="csrfmiddlewaretoken"]');
+        csrfInputs.forEach(input => {
+            input.value = csrftoken;
+        });
+    }
+}
+
+// Tab switching functionality
+document.addEventListener('DOMContentLoaded', function () {
+    const tabs = document.querySelectorAll('.tab');
+    const tabContents = document.querySelectorAll('.tab-content');
+
+    // Set CSRF token on page load
+    setCSRFToken();
+
+    tabs.forEach(tab => {
+        tab.addEventListener('click', function (e) {
+            e.preventDefault();
+
+            // Remove active class from all tabs and contents
+            tabs.forEach(t => t.classList.remove('active'));
+            tabContents.forEach(content => content.classList.remove('active'));
+
+            // Add active class to clicked tab
+            this.classList.add('active');
+
+            // Show corresponding content
+            const platform = this.getAttribute('data-platform');
+            const targetContent = document.querySelector(`[data-content="${platform}"]`);
+            if (targetContent) {
+                targetContent.classList.add('active');
+            }
+        });
+    });
+
+    // Create animated particles
+    createParticles();
+
+    // Handle video info form submission
+    const videoInfoForm = document.getElementById('videoInfoForm');
+    if (videoInfoForm) {
+        videoInfoForm.addEventListener('submit', function (e) {
+            e.preventDefault();
+            handleVideoInfo(this);
+        });
+    }
+
+    // Show the progress message while a download form submits
+    document.querySelectorAll('form[data-download-form]').forEach(form => {
+        form.addEventListener('submit', showDownloadMessage);
+    });
+
+    // Handle quality selection
+    document.addEventListener('click', function (e) {
+        if (e.target.classList.contains('quality-option')) {
+            selectQuality(e.target);
+        }
+    });
+});
+
+function handleVideoInfo(form) {
+    const formData = new FormData(form);
+    const progressMessage = document.getElementById('progressMessage');
+    const errorMessages = document.getElementById('errorMessages');
+
+    // Show loading
+    progressMessage.style.display = 'block';
+    errorMessages.innerHTML = '';
+
+    fetch(form.dataset.infoUrl, {
+        method: 'POST',
+        body: formData,
+        headers: {
+            'X-Requested-With': 'XMLHttpRequest',
+            'X-CSRFToken': getCookie('csrftoken')
+        }
+    })
+        .then(response => {
+            if (!response.ok && response.headers.get('Content-Type') !== 'application/json') {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            if (response.headers.get('Content-Type') === 'application/json') {
+                return response.json().then(handleInfoLine);
+            }
+            return readInfoStream(response.body.getReader());
+        })
+        .catch(error => {
+            console.error('Fetch error:', error);
+            progressMessage.style.display = 'none';
+            showError('Network error occurred: ' + error.message);
+        });
+}
+
+// Read the NDJSON info stream: a quick "basic" line, then the "full" line with formats
+function readInfoStream(reader) {
+    const decoder = new TextDecoder();
+    let buffered = '';
+
+    function pump() {
+        return reader.read().then(({ done, value }) => {
+            if (value) {
+                buffered += decoder.decode(value, { stream: true });
+                const lines = buffered.split('\n');
+                buffered = lines.pop();
+                lines.filter(line => line.trim()).forEach(line => handleInfoLine(JSON.parse(line)));
+            }
+            if (!done) {
+                return pump();
+            }
+            if (buffered.trim()) {
+                handleInfoLine(JSON.parse(buffered));
+            }
+        });
+    }
+    return pump();
+}
+
+function handleInfoLine(data) {
+    document.getElementById('progressMessage').style.display = 'none';
+
+    if (data.success) {
+        displayVideoInfo(data.video_info);
+    } else {
+        showError(data.error || 'Failed to get video information');
+    }
+}
+
+function displayVideoInfo(videoInfo) {
+    const thumbnail = document.getElementById('videoThumbnail');
+    if (videoInfo.thumbnail_proxy) {
+        // Resized copy from our cache, sharp on high-DPI screens
+        const proxy = videoInfo.thumbnail_proxy;
+        thumbnail.srcset = `${proxy}?w=120 1x, ${proxy}?w=240 2x, ${proxy}?w=360 3x`;
+        thumbnail.src = `${proxy}?w=240`;
+    } else {
+        thumbnail.removeAttribute('srcset');
+        thumbnail.src = videoInfo.thumbnail;
+    }
+    document.getElementById('videoTitle').textContent = videoInfo.title;
+    document.getElementById('videoUploader').textContent = videoInfo.uploader;
+    document.getElementById('videoDuration').textContent = `Duration: ${videoInfo.duration}`;
+
+    // Populate quality options
+    const qualityOptions = document.getElementById('qualityOptions');
+    qualityOptions.innerHTML = '';
+
+    if (!videoInfo.formats) {
+        // First paint only: the format list arrives on the next line
+        qualityOptions.innerHTML = '<div class="loading"></div> Loading available qualities...';
+    }
+
+    (videoInfo.formats || []).forEach(format => {
+        const option = document.createElement('div');
+        option.className = 'quality-option';
+        option.dataset.formatId = format.format_id;
+        option.dataset.quality = format.quality;
+        option.innerHTML = `
+            <strong>${format.quality}</strong><br>
+            <small>${format.ext} • ${format.filesize || 'Unknown size'}</small>
+        `;
+        qualityOptions.appendChild(option);
+    });
+
+    document.getElementById('videoInfoDisplay').style.display = 'block';
+    document.getElementById('downloadUrl').value = document.getElementById('videoUrl').value;
+}
+
+function selectQuality(element) {
+    // Remove previous selection
+    document.querySelectorAll('.quality-option').forEach(opt => opt.classList.remove('selected'));
+
+    // Add selection to clicked element
+    element.classList.add('selected');
+
+    // Update hidden form fields
+    document.getElementById('selectedFormatId').value = element.dataset.formatId;
+    document.getElementById('selectedQuality').value = element.dataset.quality;
+
+    // Enable download button
+    document.getElementById('finalDownloadBtn').disabled = false;
+}
+
+function showError(message) {
+    const errorMessages = document.getElementById('errorMessages');
+    errorMessages.innerHTML = `<div class="error-message">${message}</div>`;
+}
+
+function showDownloadMessage(event) {
+    if (event.defaultPrevented) {
+        return;
+    }
+    const progressMessage = document.getElementById('progressMessage');
+    const loading = progressMessage.querySelector('.loading');
+
+    progressMessage.style.display = 'block';
+    loading.style.display = 'inline-block';
+
+    // Add some visual feedback
+    progressMessage.style.animation = 'slideUp 0.5s ease-out';
+}
+
+function createParticles() {
+    const particlesContainer = document.getElementById('particles');
+    const particleCount = 50;
+
+    for (let i = 0; i < particleCount; i++) {
+        const particle = document.createElement('div');
+        particle.className = 'particle';
+
+        // Random positioning
+        particle.style.left = Math.random() * 100 + '%';
+        particle.style.top = Math.random() * 100 + '%';
+
+        // Random animation delay
+        particle.style.animationDelay = Math.random() * 6 + 's';
+        particle.style.animationDuration = (Math.random() * 4 + 4) + 's';
+
+        particlesContainer.appendChild(particle);
+    }
+}
+
+// Add smooth scrolling and enhanced interactions
+document.querySelectorAll('input').forEach(input => {
+    input.addEventListener('focus', function () {
+        this.parentElement.style.transform = 'scale(1.02)';
+    });
+
+    input.addEventListener('blur', function () {
+        this.parentElement.style.transform = 'scale(1)';
+    });
+});
+
+// Enhanced button interactions
+document.querySelectorAll('.download-btn, .info-btn').forEach(btn => {
+    btn.addEventListener('mouseenter', function () {
+        if (!this.disabled) {
+            this.style.transform = 'translateY(-3px) scale(1.05)';
+        }
+    });
+
+    btn.addEventListener('mouseleave', function () {
+        this.style.transform = 'translateY(0) scale(1)';
+    });
+});
+
+// Add form validation
+document.querySelectorAll('form').forEach(form => {
+    form.addEventListener('submit', function (e) {
+        const urlInput = this.querySelector('input[name="urlLink"]');
+        if (urlInput && !urlInput.value.trim()) {
+            e.preventDefault();
+            showError('Please enter a valid URL');
+            return false;
+        }
+
+        // Update CSRF token before submission
+        setCSRFToken();
+    });
+});
+
+// Auto-hide messages after some time
+function autoHideMessage(element, delay = 5000) {
+    setTimeout(() => {
+        if (element.style.display !== 'none') {
+            element.style.opacity = '0';
+            element.style.transform = 'translateY(-20px)';
+            setTimeout(() => {
+                element.style.display = 'none';
+                element.style.opacity = '1';
+                element.style.transform = 'translateY(0)';
+            }, 300);
+        }
+    }, delay);
+}